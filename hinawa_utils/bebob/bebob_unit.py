@@ -10,6 +10,7 @@ gi.require_version('Hinawa', '4.0')
 gi.require_version('Hitaki', '0.0')
 from gi.repository import GLib, Hinawa, Hitaki
 
+from hinawa_utils.ta1394.fcp_engine import FcpEngine
 from hinawa_utils.ta1394.general import AvcGeneral, AvcConnection
 from hinawa_utils.ta1394.ccm import AvcCcm
 
@@ -22,6 +23,11 @@ __all__ = ['BebobUnit']
 class BebobUnit(Hitaki.SndUnit):
     REG_INFO = 0xffffc8020000
 
+    # The number of AV/C commands outstanding at once, used to pipeline status
+    # commands for plug info. MEMO: DM1500-based units are known to time out,
+    # thus models verified to handle pipelined commands can override it.
+    FCP_MAX_OUTSTANDING = 1
+
     def __init__(self, path):
         super().__init__()
         self.open(path, 0)
@@ -53,9 +59,11 @@ class BebobUnit(Hitaki.SndUnit):
 
         self.fcp = Hinawa.FwFcp()
         _ = self.fcp.bind(self.get_node())
+        self.fcp_engine = FcpEngine(self.fcp, self.FCP_MAX_OUTSTANDING)
         self.firmware_info = self._get_firmware_info()
 
     def release(self):
+        self.fcp_engine.release()
         self.fcp.unbind()
         self.__unit_dispatcher.quit()
         self.__node_dispatcher.quit()
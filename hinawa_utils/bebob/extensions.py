@@ -25,18 +25,43 @@ class BcoPlugInfo():
     PORT_TYPE = ('speaker', 'headphone', 'microphone', 'line', 'spdif',
                  'adat', 'tdif', 'madi', 'analog', 'digital', 'MIDI', 'no-type')
 
+    _ADDR_DIR_CODES = {d: i for i, d in enumerate(ADDR_DIR)}
+    _ADDR_MODE_CODES = {m: i for i, m in enumerate(ADDR_MODE)}
+    _ADDR_UNIT_TYPE_CODES = {t: i for i, t in enumerate(ADDR_UNIT_TYPE)}
+
+    # Code of info type and the length of command frame to match response.
+    # The argument is echoed in response for channel position name and cluster
+    # info, thus it's included to match.
+    __INFO_TYPES = {
+        'type':         (0x00, 10),
+        'name':         (0x01, 10),
+        'channels':     (0x02, 10),
+        'clusters':     (0x03, 10),
+        'ch-name':      (0x04, 11),
+        'input':        (0x05, 10),
+        'outputs':      (0x06, 10),
+        'cluster-info': (0x07, 11),
+    }
+
+    @classmethod
+    def __build_plug_info_args(cls, addr, info_type, info_arg=0xff):
+        # Plug info command with Bco plug info subcommand. All of info types
+        # share the frame.
+        return bytearray((0x01, addr[5], 0x02, 0xc0, addr[0], addr[1], addr[2],
+                          addr[3], addr[4], info_type, info_arg, 0xff))
+
     @classmethod
     def get_unit_addr(cls, addr_dir, addr_unit_type, plug):
-        if addr_dir not in cls.ADDR_DIR:
+        if addr_dir not in cls._ADDR_DIR_CODES:
             raise ValueError('Invalid argument for address direction')
-        if addr_unit_type not in cls.ADDR_UNIT_TYPE:
+        if addr_unit_type not in cls._ADDR_UNIT_TYPE_CODES:
             raise ValueError('Invalid argument for address unit type')
         if plug > 255:
             raise ValueError('Invalid argument for plug number')
         addr = bytearray()
-        addr.append(cls.ADDR_DIR.index(addr_dir))
-        addr.append(cls.ADDR_MODE.index('unit'))
-        addr.append(cls.ADDR_UNIT_TYPE.index(addr_unit_type))
+        addr.append(cls._ADDR_DIR_CODES[addr_dir])
+        addr.append(cls._ADDR_MODE_CODES['unit'])
+        addr.append(cls._ADDR_UNIT_TYPE_CODES[addr_unit_type])
         addr.append(plug)
         addr.append(0xff)
         # For my purpose.
@@ -45,67 +70,67 @@ class BcoPlugInfo():
 
     @classmethod
     def get_subunit_addr(cls, addr_dir, subunit_type, subunit_id, plug):
-        if addr_dir not in cls.ADDR_DIR:
+        if addr_dir not in cls._ADDR_DIR_CODES:
             raise ValueError('Invalid argument for address direction')
-        if subunit_type not in AvcGeneral.SUBUNIT_TYPES:
+        if subunit_type not in AvcGeneral._SUBUNIT_TYPE_CODES:
             raise ValueError('Invalid argument for address subunit type')
         if subunit_id > 7:
             raise ValueError('Invalid argument for address subunit id')
         if plug > 255:
             raise ValueError('Invalid argument for address plug number')
         addr = bytearray()
-        addr.append(cls.ADDR_DIR.index(addr_dir))
-        addr.append(cls.ADDR_MODE.index('subunit'))
+        addr.append(cls._ADDR_DIR_CODES[addr_dir])
+        addr.append(cls._ADDR_MODE_CODES['subunit'])
         addr.append(plug)
         addr.append(0xff)
         addr.append(0xff)
         # For my purpose.
-        addr.append((AvcGeneral.SUBUNIT_TYPES.index(subunit_type) << 3) |
+        addr.append((AvcGeneral._SUBUNIT_TYPE_CODES[subunit_type] << 3) |
                     subunit_id)
         return addr
 
     @classmethod
     def get_function_block_addr(cls, addr_dir, subunit_type, subunit_id,
                                 fb_type, fb_id, plug):
-        if addr_dir not in cls.ADDR_DIR:
+        if addr_dir not in cls._ADDR_DIR_CODES:
             raise ValueError('Invalid argument for address direction')
-        if subunit_type not in AvcGeneral.SUBUNIT_TYPES:
+        if subunit_type not in AvcGeneral._SUBUNIT_TYPE_CODES:
             raise ValueError('Invalid argument for address subunit type')
         if subunit_id > 7:
             raise ValueError('Invalid argument for address subunit id')
         addr = bytearray()
-        addr.append(cls.ADDR_DIR.index(addr_dir))
-        addr.append(cls.ADDR_MODE.index('function-block'))
+        addr.append(cls._ADDR_DIR_CODES[addr_dir])
+        addr.append(cls._ADDR_MODE_CODES['function-block'])
         addr.append(fb_type)
         addr.append(fb_id)
         addr.append(plug)
         # For my purpose.
-        addr.append((AvcGeneral.SUBUNIT_TYPES.index(subunit_type) << 3) |
+        addr.append((AvcGeneral._SUBUNIT_TYPE_CODES[subunit_type] << 3) |
                     subunit_id)
         return addr
 
     @classmethod
     def build_plug_info(cls, info):
         addr = bytearray()
-        if info['dir'] not in cls.ADDR_DIR:
+        if info['dir'] not in cls._ADDR_DIR_CODES:
             raise ValueError('Invalid address direction')
-        addr.append(cls.ADDR_DIR.index(info['dir']))
-        if info['mode'] not in cls.ADDR_MODE:
+        addr.append(cls._ADDR_DIR_CODES[info['dir']])
+        if info['mode'] not in cls._ADDR_MODE_CODES:
             raise ValueError('Invalid address mode')
-        addr.append(cls.ADDR_MODE.index(info['mode']))
+        addr.append(cls._ADDR_MODE_CODES[info['mode']])
         data = info['data']
         if info['mode'] == 'unit':
-            if data['unit-type'] not in cls.ADDR_UNIT_TYPE:
+            if data['unit-type'] not in cls._ADDR_UNIT_TYPE_CODES:
                 raise ValueError('Invalid address unit type')
-            addr.append(cls.ADDR_UNIT_TYPE.index(data['unit-type']))
+            addr.append(cls._ADDR_UNIT_TYPE_CODES[data['unit-type']])
             addr.append(data['plug'])
             addr.append(0xff)
             addr.append(0xff)
             addr.append(0xff)
         else:
-            if data['subunit-type'] not in AvcGeneral.SUBUNIT_TYPES:
+            if data['subunit-type'] not in AvcGeneral._SUBUNIT_TYPE_CODES:
                 raise ValueError('Invalid address subunit type')
-            addr.append(AvcGeneral.SUBUNIT_TYPES.index(data['subunit-type']))
+            addr.append(AvcGeneral._SUBUNIT_TYPE_CODES[data['subunit-type']])
             addr.append(data['subunit-id'])
             addr.append(0xff)
             addr.append(0xff)
@@ -147,176 +172,115 @@ class BcoPlugInfo():
         return info
 
     @classmethod
-    def get_plug_type(cls, fcp, addr):
-        args = bytearray()
-        args.append(0x01)
-        args.append(addr[5])
-        args.append(0x02)   # Plug info command
-        args.append(0xc0)   # Bco plug info subcommand
-        args.append(addr[0])
-        args.append(addr[1])
-        args.append(addr[2])
-        args.append(addr[3])
-        args.append(addr[4])
-        args.append(0x00)   # Info type is 'type'
-        args.append(0xff)
-        args.append(0xff)
+    def __parse_plug_info(cls, info_type, params):
+        if info_type == 'type':
+            if params[10] > len(cls.PLUG_TYPE):
+                raise OSError('Unexpected value in response')
+            return cls.PLUG_TYPE[params[10]]
+        elif info_type == 'name':
+            length = params[10]
+            if length == 0:
+                return ""
+            return params[11:11 + length].decode()
+        elif info_type == 'channels':
+            return params[10]
+        elif info_type == 'clusters':
+            data = memoryview(params)[10:]
+            pos = 0
+            clusters = [[] for i in range(data[pos])]
+            pos += 1
+            for i in range(len(clusters)):
+                num = data[pos]
+                pos += 1
+                if num == 0:
+                    break
+
+                clusters[i] = [[0, 0] for j in range(num)]
+                for e in range(len(clusters[i])):
+                    clusters[i][e][0] = data[pos]
+                    clusters[i][e][1] = data[pos + 1]
+                    pos += 2
+            return clusters
+        elif info_type == 'ch-name':
+            length = params[11]
+            return params[12:12 + length].decode()
+        elif info_type == 'cluster-info':
+            length = params[12]
+            return params[13:13 + length].decode()
+        elif info_type == 'input':
+            return cls.parse_plug_addr(memoryview(params)[10:])
+        else:
+            info = []
+            plugs = params[10]
+            if plugs != 0xff:
+                for i in range(plugs):
+                    addr = cls.parse_plug_addr(params[11 + i * 7:])
+                    info.append(addr)
+            return info
+
+    @classmethod
+    def __get_plug_info(cls, fcp, addr, info_type, info_arg=0xff):
+        code, _ = cls.__INFO_TYPES[info_type]
+        args = cls.__build_plug_info_args(addr, code, info_arg)
         params = AvcGeneral.command_status(fcp, args)
-        if params[10] > len(cls.PLUG_TYPE):
-            raise OSError('Unexpected value in response')
-        return cls.PLUG_TYPE[params[10]]
+        return cls.__parse_plug_info(info_type, params)
+
+    @classmethod
+    def get_plug_info_batch(cls, fcp, addr, queries):
+        # Each query is a tuple of info type and its argument. The commands
+        # are pipelined when the FwFcp is owned by FCP engine. The result is
+        # either parsed value or exception.
+        cmds = []
+        matches = []
+        for info_type, info_arg in queries:
+            if info_type not in cls.__INFO_TYPES:
+                raise ValueError('Invalid argument for info type')
+            code, match = cls.__INFO_TYPES[info_type]
+            cmds.append(cls.__build_plug_info_args(addr, code, info_arg))
+            matches.append(match)
+
+        infos = []
+        results = AvcGeneral.command_status_batch(fcp, cmds, matches)
+        for (info_type, _), result in zip(queries, results):
+            if not isinstance(result, Exception):
+                try:
+                    result = cls.__parse_plug_info(info_type, result)
+                except Exception as e:
+                    result = e
+            infos.append(result)
+        return infos
+
+    @classmethod
+    def get_plug_type(cls, fcp, addr):
+        return cls.__get_plug_info(fcp, addr, 'type')
 
     @classmethod
     def get_plug_name(cls, fcp, addr):
-        args = bytearray()
-        args.append(0x01)
-        args.append(addr[5])
-        args.append(0x02)   # Plug info command
-        args.append(0xc0)   # Bco plug info subcommand
-        args.append(addr[0])
-        args.append(addr[1])
-        args.append(addr[2])
-        args.append(addr[3])
-        args.append(addr[4])
-        args.append(0x01)   # Info type is 'name'
-        args.append(0xff)
-        args.append(0xff)
-        params = AvcGeneral.command_status(fcp, args)
-        length = params[10]
-        if length == 0:
-            return ""
-        return params[11:11 + length].decode()
+        return cls.__get_plug_info(fcp, addr, 'name')
 
     @classmethod
     def get_plug_channels(cls, fcp, addr):
-        args = bytearray()
-        args.append(0x01)
-        args.append(addr[5])
-        args.append(0x02)   # Plug info command
-        args.append(0xc0)   # Bco plug info subcommand
-        args.append(addr[0])
-        args.append(addr[1])
-        args.append(addr[2])
-        args.append(addr[3])
-        args.append(addr[4])
-        args.append(0x02)   # Info type is 'the number of channels'
-        args.append(0xff)
-        args.append(0xff)
-        params = AvcGeneral.command_status(fcp, args)
-        return params[10]
+        return cls.__get_plug_info(fcp, addr, 'channels')
 
     @classmethod
     def get_plug_ch_name(cls, fcp, addr, pos):
-        args = bytearray()
-        args.append(0x01)
-        args.append(addr[5])
-        args.append(0x02)   # Plug info command
-        args.append(0xc0)   # Bco plug info subcommand
-        args.append(addr[0])
-        args.append(addr[1])
-        args.append(addr[2])
-        args.append(addr[3])
-        args.append(addr[4])
-        args.append(0x04)   # Info type is 'channel position name'
-        args.append(pos)
-        args.append(0xff)
-        params = AvcGeneral.command_status(fcp, args)
-        length = params[11]
-        return params[12:12 + length].decode()
+        return cls.__get_plug_info(fcp, addr, 'ch-name', pos)
 
     @classmethod
     def get_plug_clusters(cls, fcp, addr):
-        args = bytearray()
-        args.append(0x01)
-        args.append(addr[5])
-        args.append(0x02)   # Plug info command
-        args.append(0xc0)   # Bco plug info subcommand
-        args.append(addr[0])
-        args.append(addr[1])
-        args.append(addr[2])
-        args.append(addr[3])
-        args.append(addr[4])
-        args.append(0x03)   # Info type is 'channel position data'
-        args.append(0xff)
-        args.append(0xff)
-        params = AvcGeneral.command_status(fcp, args)
-        data = params[10:]
-        pos = 0
-        clusters = [[] for i in range(data[pos])]
-        pos += 1
-        for cls in range(len(clusters)):
-            num = data[pos]
-            pos += 1
-            if num == 0:
-                break
-
-            clusters[cls] = [[0, 0] for j in range(num)]
-            for e in range(len(clusters[cls])):
-                clusters[cls][e][0] = data[pos]
-                clusters[cls][e][1] = data[pos + 1]
-                pos += 2
-        return clusters
+        return cls.__get_plug_info(fcp, addr, 'clusters')
 
     @classmethod
     def get_plug_cluster_info(cls, fcp, addr, cluster):
-        args = bytearray()
-        args.append(0x01)
-        args.append(addr[5])
-        args.append(0x02)   # Plug info command
-        args.append(0xc0)   # Bco plug info subcommand
-        args.append(addr[0])
-        args.append(addr[1])
-        args.append(addr[2])
-        args.append(addr[3])
-        args.append(addr[4])
-        args.append(0x07)   # Info type is 'cluster info'
-        args.append(cluster)
-        args.append(0xff)
-        params = AvcGeneral.command_status(fcp, args)
-        length = params[12]
-        return params[13:13 + length].decode()
+        return cls.__get_plug_info(fcp, addr, 'cluster-info', cluster)
 
     @classmethod
     def get_plug_input(cls, fcp, addr):
-        args = bytearray()
-        args.append(0x01)
-        args.append(addr[5])
-        args.append(0x02)   # Plug info command
-        args.append(0xc0)   # Bco plug info subcommand
-        args.append(addr[0])
-        args.append(addr[1])
-        args.append(addr[2])
-        args.append(addr[3])
-        args.append(addr[4])
-        args.append(0x05)   # Info type is 'input data'
-        args.append(0xff)
-        args.append(0xff)
-        params = AvcGeneral.command_status(fcp, args)
-        return cls.parse_plug_addr(params[10:])
+        return cls.__get_plug_info(fcp, addr, 'input')
 
     @classmethod
     def get_plug_outputs(cls, fcp, addr):
-        args = bytearray()
-        args.append(0x01)
-        args.append(addr[5])
-        args.append(0x02)   # Plug info command
-        args.append(0xc0)   # Bco plug info subcommand
-        args.append(addr[0])
-        args.append(addr[1])
-        args.append(addr[2])
-        args.append(addr[3])
-        args.append(addr[4])
-        args.append(0x06)   # Info type is 'output data'
-        args.append(0xff)
-        args.append(0xff)
-        params = AvcGeneral.command_status(fcp, args)
-        info = []
-        plugs = params[10]
-        if plugs != 0xff:
-            for i in range(plugs):
-                addr = cls.parse_plug_addr(params[11 + i * 7:])
-                info.append(addr)
-        return info
+        return cls.__get_plug_info(fcp, addr, 'outputs')
 
 
 class BcoSubunitInfo():
@@ -328,17 +292,14 @@ class BcoSubunitInfo():
 
     @classmethod
     def get_subunit_fb_info(cls, fcp, subunit_type, subunit_id, page, fb_type):
-        if subunit_type not in AvcGeneral.SUBUNIT_TYPES:
+        if subunit_type not in AvcGeneral._SUBUNIT_TYPE_CODES:
             raise ValueError('Invalid argument for subunit type')
         if subunit_id > 7:
             raise ValueError('Invalid argument for subunit id')
-        args = bytearray(0xff for i in range(30))
-        args[0] = 0x01
-        args[1] = (AvcGeneral.SUBUNIT_TYPES.index(
-            subunit_type) << 3) | subunit_id
-        args[2] = 0x31
-        args[3] = page
-        args[4] = 0xff
+        subunit = AvcGeneral._SUBUNIT_TYPE_CODES[subunit_type] << 3
+        # Subunit info command with filling 0xff for the rest.
+        args = bytearray((0x01, subunit | subunit_id, 0x31, page))
+        args.extend(b'\xff' * 26)
         try:
             params = AvcGeneral.command_status(fcp, args)
         except Exception as e:
@@ -363,6 +324,9 @@ class BcoVendorDependent():
     SUPPORTED_SPEC = ('con', 'pro')
     ADDR_DIR = ('input', 'output')
 
+    _SUPPORTED_SPEC_CODES = {s: i for i, s in enumerate(SUPPORTED_SPEC)}
+    _ADDR_DIR_CODES = {d: i for i, d in enumerate(ADDR_DIR)}
+
     # For IEC 60958-1, a.k.a. 'concumer' or 'S/PDIF'
     SUPPORTED_CON_STATUS = {
         # name, the number of values
@@ -456,13 +420,8 @@ class BcoVendorDependent():
         if attrs[name] != 1:
             if type(values) != 'list' or len(values) != attrs[name]:
                 raise ValueError('Invalid argument for attribute value length')
-        args = bytearray(0xff for i in range(10))
-        args[0] = 0x00
-        args[1] = 0xff
-        args[2] = 0x00
-        args[3] = cls.SUPPORTED_SPEC.index(spec)
-        args[4] = subcmds[name]
-        args[5] = attrs[name]
+        args = bytearray((0x00, 0xff, 0x00, cls._SUPPORTED_SPEC_CODES[spec],
+                          subcmds[name], attrs[name], 0xff, 0xff, 0xff, 0xff))
         if attrs[name] == 1:
             args[6] = values
         else:
@@ -482,27 +441,18 @@ class BcoVendorDependent():
             raise ValueError('Invalid argument for specification name')
         if name not in attrs:
             raise ValueError('Invalid argument for attribute name')
-        args = bytearray(0xff for i in range(10))
-        args[0] = 0x01
-        args[1] = 0xff
-        args[2] = 0x00
-        args[3] = cls.SUPPORTED_SPEC.index(spec)
-        args[4] = subcmds[name]
-        args[5] = attrs[name]
+        args = bytearray((0x01, 0xff, 0x00, cls._SUPPORTED_SPEC_CODES[spec],
+                          subcmds[name], attrs[name], 0xff, 0xff, 0xff, 0xff))
         params = AvcGeneral.command_status(fcp, args)
         return params[6:6 + attrs[name]]
 
     @classmethod
     def get_stream_detection(cls, fcp, company_ids, dir, ext_plug):
-        if dir not in cls.ADDR_DIR:
+        if dir not in cls._ADDR_DIR_CODES:
             raise ValueError('Invalid argument for address direction')
         if ext_plug >= 255:
             raise ValueError('Invalid argument for external plug number')
-        args = bytearray()
-        args.append(0x00)
-        args.append(cls.ADDR_DIR.index(dir))
-        args.append(ext_plug)
-        args.append(0xff)
+        args = bytearray((0x00, cls._ADDR_DIR_CODES[dir], ext_plug, 0xff))
         params = AvcGeneral.get_vendor_dependent(fcp, company_ids, args)
         if params[0] != args[0] or params[1] != args[1] or params[2] != args[2]:
             raise OSError('Unexpected value in response')
@@ -534,25 +484,16 @@ class BcoStreamFormatInfo():
     @classmethod
     def get_entry_list(cls, fcp, addr):
         fmts = []
+        # Bco stream format support command with list request.
+        args = bytearray((0x01, addr[5], 0x2f, 0xc1, addr[0], addr[1], addr[2],
+                          addr[3], addr[4], 0xff, 0x00, 0xff))
         for i in range(0xff):
             # DM1500 tends to cause timeout.
             time.sleep(0.1)
             try:
-                args = bytearray()
-                args.append(0x01)
-                args.append(addr[5])
-                args.append(0x2f)   # Bco stream format support
-                args.append(0xc1)   # List request
-                args.append(addr[0])
-                args.append(addr[1])
-                args.append(addr[2])
-                args.append(addr[3])
-                args.append(addr[4])
-                args.append(0xff)
-                args.append(i)
-                args.append(0xff)
+                args[10] = i
                 params = AvcGeneral.command_status(fcp, args)
-                fmts.append(cls._parse_format(params[11:]))
+                fmts.append(cls._parse_format(memoryview(params)[11:]))
             except OSError as e:
                 if str(e) != 'Rejected':
                     raise
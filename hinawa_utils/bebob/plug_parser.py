@@ -38,29 +38,12 @@ class PlugParser():
 
     @classmethod
     def parse_unit_plug(cls, fcp, dir, type, num):
-        plug = {}
         addr = BcoPlugInfo.get_unit_addr(dir, type, num)
-        plug['type'] = BcoPlugInfo.get_plug_type(fcp, addr)
-        plug['name'] = BcoPlugInfo.get_plug_name(fcp, addr)
-        plug['channels'] = []
-        channels = BcoPlugInfo.get_plug_channels(fcp, addr)
-        for channel in range(channels):
-            ch = BcoPlugInfo.get_plug_ch_name(fcp, addr, channel + 1)
-            plug['channels'].append(ch)
-        plug['clusters'] = []
-        if plug['type'] == 'IsoStream':
-            clusters = BcoPlugInfo.get_plug_clusters(fcp, addr)
-            for cluster in range(len(clusters)):
-                clst = BcoPlugInfo.get_plug_cluster_info(
-                    fcp, addr, cluster + 1)
-                plug['clusters'].append(clst)
-        plug['input'] = []
-        plug['outputs'] = []
         if dir == 'output':
-            plug['input'] = BcoPlugInfo.get_plug_input(fcp, addr)
+            links = ('input', )
         else:
-            plug['outputs'] = BcoPlugInfo.get_plug_outputs(fcp, addr)
-        return plug
+            links = ('outputs', )
+        return cls.__parse_plug(fcp, addr, [], links, True)
 
     @classmethod
     def parse_subunit_plugs(cls, fcp):
@@ -91,34 +74,9 @@ class PlugParser():
 
     @classmethod
     def parse_subunit_plug(cls, fcp, dir, type, id, num):
-        plug = {}
         addr = BcoPlugInfo.get_subunit_addr(dir, type, id, num)
-        plug['type'] = BcoPlugInfo.get_plug_type(fcp, addr)
-        plug['name'] = BcoPlugInfo.get_plug_name(fcp, addr)
-        plug['channels'] = []
-        channels = BcoPlugInfo.get_plug_channels(fcp, addr)
-        for channel in range(channels):
-            ch = BcoPlugInfo.get_plug_ch_name(fcp, addr, channel + 1)
-            plug['channels'].append(ch)
-        plug['clusters'] = []
-        if plug['type'] == 'IsoStream':
-            clusters = BcoPlugInfo.get_plug_clusters(fcp, addr)
-            for cluster in range(len(clusters)):
-                clst = BcoPlugInfo.get_plug_cluster_info(
-                    fcp, addr, cluster + 1)
-                plug['clusters'].append(clst)
-        plug['input'] = {}
-        plug['outputs'] = []
         # Music subunits have counter direction.
-        try:
-            plug['input'] = BcoPlugInfo.get_plug_input(fcp, addr)
-        except Exception:
-            pass
-        try:
-            plug['outputs'] = BcoPlugInfo.get_plug_outputs(fcp, addr)
-        except Exception:
-            pass
-        return plug
+        return cls.__parse_plug(fcp, addr, {}, ('input', 'outputs'), False)
 
     @classmethod
     def parse_function_block_plugs(cls, fcp, subunit_plugs):
@@ -163,34 +121,55 @@ class PlugParser():
 
     @classmethod
     def parse_fb_plug(cls, fcp, dir, subunit_type, subunit_id, fb_type, fb_id, num):
-        plug = {}
         addr = BcoPlugInfo.get_function_block_addr(dir, subunit_type,
                                                    subunit_id, fb_type, fb_id, num)
-        plug['type'] = BcoPlugInfo.get_plug_type(fcp, addr)
-        plug['name'] = BcoPlugInfo.get_plug_name(fcp, addr)
-        plug['channels'] = []
-        channels = BcoPlugInfo.get_plug_channels(fcp, addr)
-        for channel in range(channels):
-            ch = BcoPlugInfo.get_plug_ch_name(fcp, addr, channel + 1)
-            plug['channels'].append(ch)
-        plug['clusters'] = []
-        if plug['type'] == 'IsoStream':
-            clusters = BcoPlugInfo.get_plug_clusters(fcp, addr)
-            for cluster in range(len(clusters)):
-                clst = BcoPlugInfo.get_plug_cluster_info(
-                    fcp, addr, cluster + 1)
-                plug['clusters'].append(clst)
-        plug['input'] = {}
-        plug['outputs'] = []
         # Music subunits have counter direction.
-        try:
-            plug['input'] = BcoPlugInfo.get_plug_input(fcp, addr)
-        except Exception:
-            pass
-        try:
-            plug['outputs'] = BcoPlugInfo.get_plug_outputs(fcp, addr)
-        except Exception:
-            pass
+        return cls.__parse_plug(fcp, addr, {}, ('input', 'outputs'), False)
+
+    @classmethod
+    def __parse_plug(cls, fcp, addr, input, links, strict):
+        # The queries for the plug are sent in three batches since the
+        # arguments of the later ones depend on the former responses.
+        plug = {
+            'type':     None,
+            'name':     None,
+            'channels': [],
+            'clusters': [],
+            'input':    input,
+            'outputs':  [],
+        }
+
+        queries = [('type', 0xff), ('name', 0xff), ('channels', 0xff)]
+        queries.extend((link, 0xff) for link in links)
+        results = BcoPlugInfo.get_plug_info_batch(fcp, addr, queries)
+        for (info_type, _), result in zip(queries, results):
+            if isinstance(result, Exception):
+                if strict or info_type not in links:
+                    raise result
+                continue
+            if info_type == 'channels':
+                channels = result
+            else:
+                plug[info_type] = result
+
+        queries = [('ch-name', i + 1) for i in range(channels)]
+        if plug['type'] == 'IsoStream':
+            queries.append(('clusters', 0xff))
+        results = BcoPlugInfo.get_plug_info_batch(fcp, addr, queries)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        plug['channels'] = results[:channels]
+
+        if plug['type'] == 'IsoStream':
+            clusters = results[-1]
+            queries = [('cluster-info', i + 1) for i in range(len(clusters))]
+            results = BcoPlugInfo.get_plug_info_batch(fcp, addr, queries)
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+            plug['clusters'] = results
+
         return plug
 
     @classmethod
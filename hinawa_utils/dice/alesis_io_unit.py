@@ -1,7 +1,9 @@
 # SPDX-License-Identifier: LGPL-3.0-or-later
 # Copyright (C) 2018 Takashi Sakamoto
 
-from struct import pack, unpack
+from contextlib import contextmanager
+from struct import Struct, pack, unpack
+from time import monotonic, sleep
 
 import gi
 gi.require_version('Hinawa', '4.0')
@@ -50,6 +52,9 @@ class AlesisIoUnit(DiceUnit):
     Mixer-8:    043c
     '''
 
+    __MIXER_COEFF_OFFSET = 0x0038
+    __MIXER_COEFF_COUNT = 256       # 8 mixers x 32 sources.
+
     __MIXER_SRC_MUTE_OFFSETS = {
         'Mixer-1/2': 0x0458,
         'Mixer-3/4': 0x045c,
@@ -64,8 +69,14 @@ class AlesisIoUnit(DiceUnit):
         'Mixer-7/8': 0x0458,
     }
     __METER_OFFSET = 0x4c0
+    __METER_FORMAT = Struct('>40I')
     __MIXER_OUT_LEVEL_OFFSET = 0x0564
     __MIXER_23_24_SWITCH = 0x0568
+
+    # The bits of notification defined by vendor application. The switch and
+    # coefficients of mixer in application section are irrelevant to the bits
+    # for stream, clock and lock status.
+    __VENDOR_NOTIFY_MASK = 0xffff0000
     __SPDIF_OUT_SRC_OFFSET = 0x056c
     __HP34_OUT_SRC_OFFSET = 0x0570
     __MIX_BLEND_OFFSET = 0x0574     # 0x0000 - 0x0100
@@ -117,11 +128,40 @@ class AlesisIoUnit(DiceUnit):
             self.name = 'iO|26'
         self.__specs = self.__SPECS[self.name]
 
+        # Quadlets in meter space for available ports.
+        slots = list(range(0, 24))
+        if self.__specs['has_adat_b']:
+            slots.extend(range(25, 30))
+        slots.extend(range(30, 40))
+        self.__meter_slots = tuple(slots)
+        self.__meter_labels = {}
+
+        # Cache the switch for 23/24 ports of mixer source, referred by
+        # operations for mixer source.
+        self.get_invalidator().register('mixer-switch',
+                                        self.__load_mixer_switch,
+                                        ('bus-update', 'notified'),
+                                        self.__VENDOR_NOTIFY_MASK)
+        self.get_notification_worker().register(
+            self.__VENDOR_NOTIFY_MASK,
+            lambda msg: self.get_invalidator().get('mixer-switch'))
+
+        # Cache coefficients of mixer, referred by operations for pair of
+        # mixer sources. Changes in batch are staged to combine writes.
+        self.__staged_coeffs = None
+        self.__staged_cells = None
+        self.get_invalidator().register('mixer-coeffs',
+                                        self.__load_mixer_coeffs,
+                                        ('bus-update', 'disconnected',
+                                         'notified'),
+                                        self.__VENDOR_NOTIFY_MASK)
+
         # Ensure 23/24 ports of mixer source receive signal from S/PDIF-1/2 if
         # it has no optical interface for ADAT-B.
         if not self.__specs['has_adat_b']:
             data = bytearray(4)
             self.__write_data(self.__MIXER_23_24_SWITCH, data)
+            self.get_invalidator().update('mixer-switch', 0)
 
     def __write_data(self, offset, data):
         req = Hinawa.FwReq.new()
@@ -133,6 +173,87 @@ class AlesisIoUnit(DiceUnit):
         offset += self.__BASE_OFFSET
         return self._protocol.read_transactions(req, offset, length)
 
+    def __load_mixer_switch(self):
+        with self.get_scheduler().classify('refresh'):
+            data = self.__read_data(self.__MIXER_23_24_SWITCH, 4)
+        return unpack('>I', data)[0]
+
+    def __load_mixer_coeffs(self):
+        with self.get_scheduler().classify('refresh'):
+            data = self.__read_data(self.__MIXER_COEFF_OFFSET,
+                                    self.__MIXER_COEFF_COUNT * 4)
+        return list(unpack('>{0}I'.format(self.__MIXER_COEFF_COUNT), data))
+
+    def __write_mixer_coeffs(self, cells):
+        # The given cells are always written, even if the same as cache since
+        # the cache can be stale against changes by the others. Successive
+        # ones are written together.
+        runs = []
+        for i in sorted(cells):
+            if len(runs) > 0 and runs[-1][1] == i:
+                runs[-1][1] = i + 1
+            else:
+                runs.append([i, i + 1])
+
+        try:
+            for begin, end in runs:
+                vals = [cells[i] for i in range(begin, end)]
+                data = pack('>{0}I'.format(end - begin), *vals)
+                self.__write_data(self.__MIXER_COEFF_OFFSET + begin * 4, data)
+        except Exception:
+            self.get_invalidator().invalidate('mixer-coeffs')
+            raise
+
+        coeffs = self.get_invalidator().get('mixer-coeffs')
+        for i, coeff in cells.items():
+            coeffs[i] = coeff
+
+    def __set_mixer_coeffs(self, cells):
+        if self.__staged_coeffs is not None:
+            for i, coeff in cells.items():
+                self.__staged_coeffs[i] = coeff
+            self.__staged_cells.update(cells)
+        else:
+            self.__write_mixer_coeffs(cells)
+
+    @contextmanager
+    def mixer_batch(self):
+        # Changes of mixer coefficients within the scope are staged, then
+        # the changed cells are written by the least block writes at the end.
+        # Nothing is written when any exception is raised.
+        if self.__staged_coeffs is not None:
+            yield
+            return
+
+        coeffs = self.get_invalidator().get('mixer-coeffs')
+        self.__staged_coeffs = list(coeffs)
+        self.__staged_cells = {}
+        try:
+            yield
+            cells = self.__staged_cells
+        finally:
+            self.__staged_coeffs = None
+            self.__staged_cells = None
+        if len(cells) > 0:
+            self.__write_mixer_coeffs(cells)
+
+    def get_mixer_snapshot(self):
+        # A list of coefficients from 32 sources for each of 8 mixers.
+        coeffs = self.get_invalidator().get('mixer-coeffs')
+        return [list(coeffs[i:i + 32])
+                for i in range(0, self.__MIXER_COEFF_COUNT, 32)]
+
+    def set_mixer_snapshot(self, snapshot):
+        if len(snapshot) != 8 or any(len(row) != 32 for row in snapshot):
+            raise ValueError('Invalid argument for shape of snapshot.')
+        cells = {}
+        for row in snapshot:
+            for coeff in row:
+                if coeff < 0 or coeff > self.__MAX_COEFF:
+                    raise ValueError('Invalid argument for coefficient.')
+                cells[len(cells)] = coeff
+        self.__set_mixer_coeffs(cells)
+
     def get_mixer_labels(self):
         return self.__MIXER_LABELS
 
@@ -153,9 +274,7 @@ class AlesisIoUnit(DiceUnit):
                 labels.append('ADAT-A-{0}/{1}'.format(ch, ch + 1))
             for ch in range(1, 6, 2):
                 labels.append('ADAT-B-{0}/{1}'.format(ch, ch + 1))
-            data = self.__read_data(self.__MIXER_23_24_SWITCH, 4)
-            val = unpack('>I', data)[0]
-            if val > 0:
+            if self.get_invalidator().get('mixer-switch') > 0:
                 labels.append('ADAT-B-7/8')
             else:
                 labels.append('S/PDIF-1/2')
@@ -189,16 +308,20 @@ class AlesisIoUnit(DiceUnit):
 
     def __write_src_pair_values(self, dst, src, src_ch, vals):
         offsets = self.__calculate_mixer_src_gain_offsets(dst, src, src_ch)
+        cells = {}
         for i, offset in enumerate(offsets):
-            data = pack('>I', vals[i])
-            self.__write_data(offset, data)
+            cells[(offset - self.__MIXER_COEFF_OFFSET) // 4] = vals[i]
+        self.__set_mixer_coeffs(cells)
 
     def __read_src_pair_values(self, dst, src, src_ch):
         vals = [0, 0]
         offsets = self.__calculate_mixer_src_gain_offsets(dst, src, src_ch)
+        if self.__staged_coeffs is not None:
+            coeffs = self.__staged_coeffs
+        else:
+            coeffs = self.get_invalidator().get('mixer-coeffs')
         for i, offset in enumerate(offsets):
-            data = self.__read_data(offset, 4)
-            vals[i] = unpack('>I', data)[0]
+            vals[i] = coeffs[(offset - self.__MIXER_COEFF_OFFSET) // 4]
         # normalize.
         total = sum(vals)
         if total > self.__MAX_COEFF:
@@ -318,12 +441,15 @@ class AlesisIoUnit(DiceUnit):
         else:
             val = 1
         data = pack('>I', val)
-        self.__write_data(self.__MIXER_23_24_SWITCH, data)
+        try:
+            self.__write_data(self.__MIXER_23_24_SWITCH, data)
+        except Exception:
+            self.get_invalidator().invalidate('mixer-switch')
+            raise
+        self.get_invalidator().update('mixer-switch', val)
 
     def get_mixer_spdif_src(self):
-        data = self.__read_data(self.__MIXER_23_24_SWITCH, 4)
-        val = unpack('>I', data)[0]
-        return bool(val == 0)
+        return self.get_invalidator().get('mixer-switch') == 0
 
     def get_level_labels(self):
         return self.__LEVEL_LABELS
@@ -461,7 +587,17 @@ class AlesisIoUnit(DiceUnit):
         val = unpack('>I', data)[0]
         return srcs[val]
 
+    def __get_meter_labels(self):
+        # The labels are computed once per state of the switch.
+        switch = bool(self.get_invalidator().get('mixer-switch'))
+        if switch not in self.__meter_labels:
+            self.__meter_labels[switch] = tuple(self.__build_meter_labels())
+        return self.__meter_labels[switch]
+
     def get_meter_labels(self):
+        return list(self.__get_meter_labels())
+
+    def __build_meter_labels(self):
         labels = []
         for ch in range(1, 9):
             labels.append('Analog-{0}'.format(ch))
@@ -477,9 +613,7 @@ class AlesisIoUnit(DiceUnit):
                 labels.append('ADAT-A-{0}'.format(ch))
             for ch in range(1, 7):
                 labels.append('ADAT-B-{0}'.format(ch))
-            data = self.__read_data(self.__MIXER_23_24_SWITCH, 4)
-            val = unpack('>I', data)[0]
-            if val:
+            if self.get_invalidator().get('mixer-switch'):
                 labels.append('ADAT-B-7/8')
             else:
                 labels.append('S/PDIF-1/2')
@@ -487,18 +621,42 @@ class AlesisIoUnit(DiceUnit):
             labels.append('Mixer-{0}'.format(ch))
         return labels
 
-    def get_meters(self):
-        meters = []
-        data = self.__read_data(self.__METER_OFFSET, 160)
-        vals = unpack('>40I', data)
-        meters.extend(vals[0:24])
-        if self.__specs['has_adat_b']:
-            meters.extend(vals[25:30])
-        meters.extend(vals[30:])
-        for i, meter in enumerate(meters):
-            meters[i] = self.__parse_val_to_db(meter)
+    def __read_meters(self, meters, deadline):
+        with self.get_scheduler().classify('metering', deadline):
+            data = self.__read_data(self.__METER_OFFSET,
+                                    self.__METER_FORMAT.size)
+        vals = self.__METER_FORMAT.unpack(data)
+        scale = 60 / self.__MAX_COEFF
+        for i, slot in enumerate(self.__meter_slots):
+            meters[i] = -60.0 + vals[slot] * scale
+
+    def get_meters(self, deadline=None):
+        meters = [0.0] * len(self.__meter_slots)
+        self.__read_meters(meters, deadline)
         return meters
 
+    def generate_meters(self, rate=60, deadline=None):
+        # Yield a pair of labels and meters in dB per the given rate in Hz.
+        # The labels is a tuple and the meters is a list reused for next
+        # yield.
+        if rate <= 0:
+            raise ValueError('Invalid argument for rate.')
+        interval = 1 / rate
+        meters = [0.0] * len(self.__meter_slots)
+        due = monotonic()
+
+        while True:
+            self.__read_meters(meters, deadline)
+            yield self.__get_meter_labels(), meters
+
+            # Skip ticks already passed to keep the rate.
+            due += interval
+            now = monotonic()
+            if due < now:
+                due = now
+            else:
+                sleep(due - now)
+
     def get_mix_blend_ratio(self):
         data = self.__read_data(self.__MIX_BLEND_OFFSET, 4)
         val = unpack('>I', data)[0]
@@ -1,7 +1,14 @@
 # SPDX-License-Identifier: LGPL-3.0-or-later
 # Copyright (C) 2018 Takashi Sakamoto
 
-from threading import Timer
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from hashlib import sha1
+from json import load, dump, dumps
+from pathlib import Path
+from struct import Struct
+from threading import local
+from time import monotonic, sleep
 
 import gi
 gi.require_version('Hinawa', '4.0')
@@ -32,12 +39,35 @@ class DiceExtendedUnit(DiceUnit):
         PresonusFirestudioSpec,
     )
 
-    def __init__(self, fullpath):
+    # Version of persisted model of ports. Increment it when the layout of
+    # the model or the way to build it is changed.
+    __PORT_MODEL_VERSION = 1
+
+    # Period in second to wait for notification of stream change raised by
+    # switching rate or clock in this process.
+    __SWITCH_TIMEOUT = 2.0
+
+    def __init__(self, fullpath, prefetch=False):
         super().__init__(fullpath)
 
-        req = Hinawa.FwReq.new()
-        ExtCtlSpace.detect_layout(self._protocol, req)
-        ExtCapsSpace.detect_caps(self._protocol, req)
+        # Routes staged within the batch, for each thread.
+        self.__staging = local()
+
+        # Layout and capabilities of extension are cached with the others.
+        caps = self._protocol._caps_cache
+        if 'ext-layout' in caps and 'ext-caps' in caps:
+            self._protocol._ext_layout = caps['ext-layout']
+            self._protocol._ext_caps = dict(caps['ext-caps'])
+            self._protocol._ext_caps['reserved'] = \
+                bytes.fromhex(caps['ext-caps']['reserved'])
+        else:
+            req = Hinawa.FwReq.new()
+            layout = ExtCtlSpace.detect_layout(self._protocol, req)
+            ext_caps = ExtCapsSpace.detect_caps(self._protocol, req)
+            caps['ext-layout'] = layout
+            caps['ext-caps'] = dict(ext_caps)
+            caps['ext-caps']['reserved'] = bytes(ext_caps['reserved']).hex()
+            self._protocol._save_caps_cache()
 
         id_pair = (self.vendor_id, self.model_id)
         for spec in self._SPECS:
@@ -49,9 +79,57 @@ class DiceExtendedUnit(DiceUnit):
             index = 0
         self._spec = spec(index)
 
-        # Cache current format of packets in data stream.
+        # Model of ports per rate mode, persisted with digest of stream
+        # configuration which it's built from.
+        guid = self.get_property('guid')
+        self.__port_path = Path('/tmp/hinawa-{0:08x}-ports'.format(guid))
+        self.__port_models = self.__load_port_models()
+
+        # Optionally cache current configuration for all of rate modes, so
+        # that change of sampling rate is served without reading them. The
+        # notification of stream change is raised by switching rate, while
+        # the configuration for each mode is not changed by it. It's
+        # invalidated by bus reset, by writes of this module, and by the
+        # notification unless this process switched rate or clock.
+        protocol = self._protocol
+        self.__prefetch = prefetch
+        self.__switch_deadline = 0.0
+        if prefetch:
+            self.get_invalidator().register('current-configs',
+                                            self.__load_current_configs,
+                                            ('bus-update', ))
+            self.get_invalidator().get('current-configs')
+            # MEMO: registered before the handlers to reload caches built from
+            # the configuration.
+            mask = protocol.NOTIFY_RX_CFG_CHG | protocol.NOTIFY_TX_CFG_CHG
+            self.get_notification_worker().register(
+                mask, self.__handle_config_change)
+
+        # Cache current configuration of stream, referred to build ports.
+        mask = (protocol.NOTIFY_RX_CFG_CHG | protocol.NOTIFY_TX_CFG_CHG |
+                protocol.NOTIFY_CLOCK_ACCEPTED)
+        self.get_invalidator().register('stream-config',
+                                        self.__load_stream_config,
+                                        ('bus-update', 'notified'), mask)
+        self.get_notification_worker().register(
+            mask, lambda msg: self.get_invalidator().get('stream-config'))
+
+        # Cache current format of packets in data stream. It's loaded again
+        # after notification of changes to stream or clock.
+        mask = (protocol.NOTIFY_RX_CFG_CHG | protocol.NOTIFY_TX_CFG_CHG |
+                protocol.NOTIFY_LOCK_CHG | protocol.NOTIFY_CLOCK_ACCEPTED)
+        self.get_invalidator().register('router', self.__load_router_nodes,
+                                        ('bus-update', 'notified'), mask)
         self._cache_router_nodes()
-        self.connect('notified', self._handle_notification)
+        self.get_notification_worker().register(
+            mask, lambda msg: self.get_invalidator().get('router'))
+
+        # Cache coefficients of mixer to compute changed ones. Operation on
+        # the unit is notified by the bits defined by vendor, while change by
+        # the other programs is not notified at all.
+        self.get_invalidator().register('mixer', self.__load_mixer_matrix,
+                                        ('bus-update', 'disconnected',
+                                         'notified'), 0xffff0000)
 
     def _get_rate_mode(self, rate):
         for mode, rates in self._RATE_MODES.items():
@@ -60,33 +138,222 @@ class DiceExtendedUnit(DiceUnit):
         else:
             raise ValueError('Invalid argument for sampling rate.')
 
-    def _handle_notification(self, obj, message):
-        # MEMO: don't stop event loop.
-        Timer(0, self._cache_router_nodes)
+    @property
+    def _srcs(self):
+        return self.get_invalidator().get('router')['srcs']
+
+    @property
+    def _dsts(self):
+        return self.get_invalidator().get('router')['dsts']
+
+    @property
+    def _routes(self):
+        staged = self.__get_staged_routes()
+        if staged is not None:
+            return staged
+        return self.get_invalidator().get('router')['routes']
+
+    def __get_staged_routes(self):
+        return getattr(self.__staging, 'routes', None)
+
+    # Indexes of (block, channel) to a pair of label and index in the port.
+    @property
+    def _src_index(self):
+        return self.get_invalidator().get('router')['src-index']
+
+    @property
+    def _dst_index(self):
+        return self.get_invalidator().get('router')['dst-index']
+
+    # Indexes of label to the port.
+    @property
+    def _src_ports(self):
+        return self.get_invalidator().get('router')['src-ports']
+
+    @property
+    def _dst_ports(self):
+        return self.get_invalidator().get('router')['dst-ports']
 
     def _cache_router_nodes(self):
+        self.get_invalidator().invalidate('router')
+        nodes = self.get_invalidator().get('router')
+
+        # MEMO: if registered entries are not generated by this module, update
+        # them. Not friendly to the other programs while these entries are
+        # valid for the programs.
+        if nodes['normalized']:
+            self.__commit_routes(nodes['routes'])
+
+    def __load_router_nodes(self):
+        with self.get_scheduler().classify('refresh'):
+            return self.__read_router_nodes()
+
+    def __read_router_nodes(self):
         req = Hinawa.FwReq.new()
 
         rate = self._protocol.read_sampling_rate(req)
         mode = self._get_rate_mode(rate)
 
-        entries = \
-            ExtCurrentConfigSpace.read_router_config(self._protocol, req, mode)
-        srcs, dsts = self._spec.get_available_ports(self._protocol, req, mode)
+        entries = self.__get_router_config(req, mode)
+        srcs, dsts = self.__get_port_model(req, mode)
 
         routes = self._spec.normalize_router_entries(self._protocol, entries,
                                                      srcs, dsts)
 
-        # MEMO: if registered entries are not generated by this module, update
-        # them. Not friendly to the other programs while these entries are
-        # valid for the programs.
-        if entries != routes:
-            ExtNewRouterSpace.set_entries(self._protocol, req, routes)
-            ExtCmdSpace.initiate(self._protocol, req, 'load-from-router', mode)
+        # The normalized routes are not written here, since the loader runs
+        # at notification as well.
+        nodes = {
+            'srcs':         srcs,
+            'dsts':         dsts,
+            'routes':       routes,
+            'normalized':   entries != routes,
+        }
+        for name, ports in (('src', srcs), ('dst', dsts)):
+            index = {}
+            labels = {}
+            # The first one wins as well as scanning the list.
+            for port in ports:
+                for i, ch in enumerate(port[2]):
+                    index.setdefault((port[1], ch), (port[0], i))
+                labels.setdefault(port[0], port)
+            nodes['{0}-index'.format(name)] = index
+            nodes['{0}-ports'.format(name)] = labels
+
+        return nodes
+
+    def __load_port_models(self):
+        try:
+            with self.__port_path.open(mode='r') as f:
+                models = load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(models, dict):
+            return {}
+        return models
+
+    def __save_port_models(self):
+        # MEMO: the cache is just rebuilt at next time when failing.
+        try:
+            with self.__port_path.open(mode='w+') as f:
+                dump(self.__port_models, f)
+        except OSError:
+            pass
+
+    def __load_current_configs(self):
+        def read(mode, func):
+            return func(self._protocol, Hinawa.FwReq.new(), mode)
+
+        # Sections for each rate mode are read concurrently, with own FwReq
+        # for each.
+        read = self.get_scheduler().inherit(read)
+        router = ExtCurrentConfigSpace.read_router_config
+        stream = ExtCurrentConfigSpace.read_stream_config
+        with self.get_scheduler().classify('refresh'):
+            with ThreadPoolExecutor(len(self._RATE_MODES) * 2) as executor:
+                futures = {}
+                for mode in self._RATE_MODES:
+                    futures[mode] = {
+                        'router':   executor.submit(read, mode, router),
+                        'stream':   executor.submit(read, mode, stream),
+                    }
+                configs = {}
+                for mode, pair in futures.items():
+                    configs[mode] = {
+                        'router':   pair['router'].result(),
+                        'stream':   pair['stream'].result(),
+                    }
+        return configs
+
+    def __handle_config_change(self, msg):
+        # The change is raised by the switch in this process.
+        if monotonic() < self.__switch_deadline:
+            self.__switch_deadline = 0.0
+            return
+        # The caches loaded before this invalidation may refer to the stale
+        # configuration.
+        for name in ('current-configs', 'stream-config', 'router'):
+            self.get_invalidator().invalidate(name)
+
+    def set_clock_source(self, source):
+        self.__switch_deadline = monotonic() + self.__SWITCH_TIMEOUT
+        try:
+            super().set_clock_source(source)
+        except Exception:
+            self.__switch_deadline = 0.0
+            raise
+
+    def set_sampling_rate(self, rate):
+        self.__switch_deadline = monotonic() + self.__SWITCH_TIMEOUT
+        try:
+            super().set_sampling_rate(rate)
+        except Exception:
+            self.__switch_deadline = 0.0
+            raise
+
+    def __invalidate_current_configs(self):
+        # The router configuration is changed by 'load-from-router' command.
+        if self.__prefetch:
+            self.get_invalidator().invalidate('current-configs')
+
+    def __get_router_config(self, req, mode):
+        if self.__prefetch:
+            configs = self.get_invalidator().get('current-configs')
+            return [dict(entry) for entry in configs[mode]['router']]
+        return ExtCurrentConfigSpace.read_router_config(self._protocol, req,
+                                                        mode)
+
+    def __get_stream_config(self, req, mode):
+        if self.__prefetch:
+            return self.get_invalidator().get('current-configs')[mode]['stream']
+        cache = self.get_invalidator().get('stream-config')
+        if cache['mode'] == mode:
+            return cache['config']
+        return ExtCurrentConfigSpace.read_stream_config(self._protocol, req,
+                                                        mode)
+
+    def __get_port_model(self, req, mode):
+        spec = type(self._spec).__name__
+        model = self.__port_models.get(mode)
+
+        # MEMO: the persisted model is always validated by the digest of
+        # current configuration, since it can be changed while no process
+        # runs. The configuration is cached, thus read once per process.
+        configs = self.__get_stream_config(req, mode)
+        material = {
+            'spec':     spec,
+            'version':  self.__PORT_MODEL_VERSION,
+            'configs':  configs,
+        }
+        digest = sha1(dumps(material, sort_keys=True).encode()).hexdigest()
+        if model is None or model.get('digest') != digest:
+            srcs, dsts = self._spec.get_available_ports(self._protocol, req,
+                                                        mode, configs)
+            model = {
+                'spec':     spec,
+                'version':  self.__PORT_MODEL_VERSION,
+                'digest':   digest,
+                'srcs':     srcs,
+                'dsts':     dsts,
+            }
+            self.__port_models[mode] = model
+            self.__save_port_models()
+        return model['srcs'], model['dsts']
 
-        self._srcs = srcs
-        self._dsts = dsts
-        self._routes = routes
+    def __load_stream_config(self):
+        req = Hinawa.FwReq.new()
+        with self.get_scheduler().classify('refresh'):
+            rate = self._protocol.read_sampling_rate(req)
+            mode = self._get_rate_mode(rate)
+            if self.__prefetch:
+                configs = self.get_invalidator().get('current-configs')
+                config = configs[mode]['stream']
+            else:
+                config = ExtCurrentConfigSpace.read_stream_config(
+                                                    self._protocol, req, mode)
+        return {
+            'mode':     mode,
+            'config':   config,
+        }
 
     def get_caps(self, category):
         if category not in self._protocol._ext_caps:
@@ -98,7 +365,7 @@ class DiceExtendedUnit(DiceUnit):
             raise ValueError('Invalid argument for sampling rate.')
         mode = self._get_rate_mode(rate)
         req = Hinawa.FwReq.new()
-        return ExtCurrentConfigSpace.read_stream_config(self._protocol, req, mode)
+        return self.__get_stream_config(req, mode)
 
     def get_router_entries(self, rate):
         if rate not in self._protocol.get_supported_sampling_rates():
@@ -108,20 +375,19 @@ class DiceExtendedUnit(DiceUnit):
         req = Hinawa.FwReq.new()
         routes = ExtCurrentConfigSpace.read_router_config(self._protocol, req,
                                                           mode)
+        nodes = self.get_invalidator().get('router')
+        src_index = nodes['src-index']
+        dst_index = nodes['dst-index']
         for route in routes:
-            for src in self._srcs:
-                if route['src-blk'] == src[1] and route['src-ch'] in src[2]:
-                    break
-            else:
+            src = src_index.get((route['src-blk'], route['src-ch']))
+            if src is None:
                 continue
-            for dst in self._dsts:
-                if route['dst-blk'] == dst[1] and route['dst-ch'] in dst[2]:
-                    break
-            else:
+            dst = dst_index.get((route['dst-blk'], route['dst-ch']))
+            if dst is None:
                 continue
             entry = {
-                'src': '{0}:{1}'.format(src[0], src[2].index(route['src-ch'])),
-                'dst': '{0}:{1}'.format(dst[0], dst[2].index(route['dst-ch'])),
+                'src': '{0}:{1}'.format(*src),
+                'dst': '{0}:{1}'.format(*dst),
             }
             entries.append(entry)
         return entries
@@ -166,42 +432,48 @@ class DiceExtendedUnit(DiceUnit):
         req = Hinawa.FwReq.new()
         rate = self._protocol.read_sampling_rate(req)
         mode = self._get_rate_mode(rate)
-        ExtCmdSpace.initiate(self._protocol, req, 'load-from-storage', mode)
+        try:
+            ExtCmdSpace.initiate(self._protocol, req, 'load-from-storage',
+                                 mode)
+        finally:
+            self.__invalidate_current_configs()
+            self.get_invalidator().invalidate('mixer')
         # MEMO: I expect notification here.
         return categories
 
-    def _find_route_pairs(self, target):
-        for dst in self._dsts:
-            if target == dst[0]:
-                break
-        else:
+    def _find_route_pairs(self, target, dst_ports, routes):
+        if target not in dst_ports:
             raise ValueError('Invalid argument for destination.')
+        dst = dst_ports[target]
 
         pairs = []
-        for route in self._routes:
+        for route in routes:
             if route['dst-blk'] == dst[1] and route['dst-ch'] in dst[2]:
                 pairs.append(route)
 
         return sorted(pairs, key=lambda pair: (pair['src-ch'], pair['dst-ch']))
 
-    def _set_target_source(self, target, source):
-        pairs = self._find_route_pairs(target)
+    def _set_target_source(self, target, source, nodes):
+        # The routes are changed in the copy of snapshot, then committed at
+        # once unless staged.
+        staged = self.__get_staged_routes()
+        if staged is None:
+            routes = [dict(route) for route in nodes['routes']]
+        else:
+            routes = staged
+        pairs = self._find_route_pairs(target, nodes['dst-ports'], routes)
 
         if source == 'None':
             indices = []
             for pair in pairs:
-                indices.append(self._routes.index(pair))
+                indices.append(routes.index(pair))
             # Pop backwards.
             indices.sort(reverse=True)
             for index in indices:
-                self._routes.pop(index)
+                routes.pop(index)
         else:
-            for dst in self._dsts:
-                if target == dst[0]:
-                    break
-            for src in self._srcs:
-                if source == src[0]:
-                    break
+            dst = nodes['dst-ports'][target]
+            src = nodes['src-ports'][source]
 
             if len(pairs) > 0:
                 # Left->Left, Right->Right.
@@ -217,122 +489,195 @@ class DiceExtendedUnit(DiceUnit):
                         'dst-ch':   dst[2][i],
                         'peak':     0,
                     }
-                    self._routes.append(pair)
-
-        req = Hinawa.FwReq.new()
-        rate = self._protocol.read_sampling_rate(req)
-        mode = self._get_rate_mode(rate)
-        ExtNewRouterSpace.set_entries(self._protocol, req, self._routes)
-        ExtCmdSpace.initiate(self._protocol, req, 'load-from-router', mode)
+                    routes.append(pair)
 
-    def _get_target_source(self, target):
-        pairs = self._find_route_pairs(target)
+        if staged is None:
+            self.__commit_routes(routes)
 
+    def __commit_routes(self, routes):
+        req = Hinawa.FwReq.new()
+        try:
+            rate = self._protocol.read_sampling_rate(req)
+            mode = self._get_rate_mode(rate)
+            ExtNewRouterSpace.set_entries(self._protocol, req, routes)
+            ExtCmdSpace.initiate(self._protocol, req, 'load-from-router',
+                                 mode)
+        except Exception:
+            self.get_invalidator().invalidate('router')
+            raise
+        finally:
+            self.__invalidate_current_configs()
+
+        cache = dict(self.get_invalidator().get('router'))
+        cache['routes'] = routes
+        cache['normalized'] = False
+        self.get_invalidator().update('router', cache)
+
+    @contextmanager
+    def routing_batch(self):
+        # Changes of route within the scope are staged, then written by a
+        # single transaction and load command at the end. Nothing is written
+        # when any exception is raised. The staged routes are local to the
+        # calling thread.
+        if self.__get_staged_routes() is not None:
+            yield
+            return
+
+        routes = self.get_invalidator().get('router')['routes']
+        self.__staging.routes = [dict(route) for route in routes]
+        try:
+            yield
+            staged = self.__staging.routes
+        finally:
+            self.__staging.routes = None
+        if staged != routes:
+            self.__commit_routes(staged)
+
+    def _get_target_source(self, target, nodes):
+        routes = self.__get_staged_routes()
+        if routes is None:
+            routes = nodes['routes']
+        pairs = self._find_route_pairs(target, nodes['dst-ports'], routes)
+
+        src_index = nodes['src-index']
         for pair in pairs:
-            for src in self._srcs:
-                if pair['src-blk'] == src[1] and pair['src-ch'] in src[2]:
-                    return src[0]
+            src = src_index.get((pair['src-blk'], pair['src-ch']))
+            if src is not None:
+                return src[0]
         return 'None'
 
-    def get_output_labels(self):
+    # The labels are built from the snapshot of router nodes, so that an
+    # operation refers to the same one.
+    @staticmethod
+    def __get_output_labels(nodes):
         labels = []
-        for dst in self._dsts:
+        for dst in nodes['dsts']:
             if dst[1] not in ('mixer-tx0', 'mixer-tx1', 'avs0', 'avs1'):
                 labels.append(dst[0])
         return labels
 
-    def get_output_source_labels(self):
+    @staticmethod
+    def __get_source_labels(nodes):
         labels = ['None']
-        for src in self._srcs:
+        for src in nodes['srcs']:
             labels.append(src[0])
         return labels
 
+    @staticmethod
+    def __get_tx_stream_labels(nodes):
+        labels = []
+        for dst in nodes['dsts']:
+            if dst[1] in ('avs0', 'avs1'):
+                labels.append(dst[0])
+        return labels
+
+    @staticmethod
+    def __get_mixer_output_labels(nodes):
+        labels = []
+        for src in nodes['srcs']:
+            if src[1] == 'mixer':
+                labels.append(src[0])
+        return labels
+
+    @staticmethod
+    def __get_mixer_input_labels(nodes):
+        labels = []
+        for dst in nodes['dsts']:
+            if dst[1] in ('mixer-tx0', 'mixer-tx1'):
+                labels.append(dst[0])
+        return labels
+
+    @staticmethod
+    def __get_mixer_source_labels(nodes):
+        labels = ['None']
+        for src in nodes['srcs']:
+            if src[1] != 'mixer':
+                labels.append(src[0])
+        return labels
+
+    def get_output_labels(self):
+        nodes = self.get_invalidator().get('router')
+        return self.__get_output_labels(nodes)
+
+    def get_output_source_labels(self):
+        nodes = self.get_invalidator().get('router')
+        return self.__get_source_labels(nodes)
+
     def set_output_source(self, target, source):
-        if target not in self.get_output_labels():
+        nodes = self.get_invalidator().get('router')
+        if target not in self.__get_output_labels(nodes):
             raise ValueError('Invalid argument for output pair.')
-        if source not in self.get_output_source_labels():
+        if source not in self.__get_source_labels(nodes):
             raise ValueError('Invalid argument for output source pair.')
-        self._set_target_source(target, source)
+        self._set_target_source(target, source, nodes)
 
     def get_output_source(self, target):
-        if target not in self.get_output_labels():
+        nodes = self.get_invalidator().get('router')
+        if target not in self.__get_output_labels(nodes):
             raise ValueError('Invalid argument for output pair.')
-        return self._get_target_source(target)
+        return self._get_target_source(target, nodes)
 
     def get_tx_stream_labels(self):
-        labels = []
-        for dst in self._dsts:
-            if dst[1] in ('avs0', 'avs1'):
-                labels.append(dst[0])
-        return labels
+        nodes = self.get_invalidator().get('router')
+        return self.__get_tx_stream_labels(nodes)
 
     def get_tx_stream_source_labels(self):
-        labels = ['None']
-        for src in self._srcs:
-            labels.append(src[0])
-        return labels
+        nodes = self.get_invalidator().get('router')
+        return self.__get_source_labels(nodes)
 
     def set_tx_stream_source(self, target, source):
-        if target not in self.get_tx_stream_labels():
+        nodes = self.get_invalidator().get('router')
+        if target not in self.__get_tx_stream_labels(nodes):
             raise ValueError('Invalid argument for tx stream.')
-        if source not in self.get_tx_stream_source_labels():
+        if source not in self.__get_source_labels(nodes):
             raise ValueError('Invalid argument for source of tx stream.')
-        self._set_target_source(target, source)
+        self._set_target_source(target, source, nodes)
 
     def get_tx_stream_source(self, target):
-        if target not in self.get_tx_stream_labels():
+        nodes = self.get_invalidator().get('router')
+        if target not in self.__get_tx_stream_labels(nodes):
             raise ValueError('Invalid argument for tx stream.')
-        return self._get_target_source(target)
+        return self._get_target_source(target, nodes)
 
     def get_mixer_output_labels(self):
-        labels = []
-        for src in self._srcs:
-            if src[1] == 'mixer':
-                labels.append(src[0])
-        return labels
+        nodes = self.get_invalidator().get('router')
+        return self.__get_mixer_output_labels(nodes)
 
     def get_mixer_input_labels(self):
-        labels = []
-        for dst in self._dsts:
-            if dst[1] in ('mixer-tx0', 'mixer-tx1'):
-                labels.append(dst[0])
-        return labels
+        nodes = self.get_invalidator().get('router')
+        return self.__get_mixer_input_labels(nodes)
 
     def get_mixer_source_labels(self):
-        labels = ['None']
-        for src in self._srcs:
-            if src[1] != 'mixer':
-                labels.append(src[0])
-        return labels
+        nodes = self.get_invalidator().get('router')
+        return self.__get_mixer_source_labels(nodes)
 
     def set_mixer_source(self, target, source):
-        if target not in self.get_mixer_input_labels():
+        nodes = self.get_invalidator().get('router')
+        if target not in self.__get_mixer_input_labels(nodes):
             raise ValueError('Invalid argument for mixer pair.')
-        if source not in self.get_mixer_source_labels():
+        if source not in self.__get_mixer_source_labels(nodes):
             raise ValueError('Invalid argument for mixer source pair.')
-        self._set_target_source(target, source)
+        self._set_target_source(target, source, nodes)
 
     def get_mixer_source(self, target):
-        if target not in self.get_mixer_input_labels():
+        nodes = self.get_invalidator().get('router')
+        if target not in self.__get_mixer_input_labels(nodes):
             raise ValueError('Invalid argument for mixer pair.')
-        return self._get_target_source(target)
+        return self._get_target_source(target, nodes)
 
     def _get_mixer_gains(self, req, output, input, ch):
-        if self.get_mixer_source(input) == 'None':
+        nodes = self.get_invalidator().get('router')
+        if input not in self.__get_mixer_input_labels(nodes):
+            raise ValueError('Invalid argument for mixer pair.')
+        if self._get_target_source(input, nodes) == 'None':
             raise ValueError('This input to mixer has no source.')
-        if output not in self.get_mixer_output_labels():
+        if output not in self.__get_mixer_output_labels(nodes):
             raise ValueError('Invalid argument for mixer stereo pair.')
-        if input not in self.get_mixer_input_labels():
-            raise ValueError('Invalid argument for mixer input stereo pair.')
         if ch not in (0, 1):
             raise ValueError('Invalid argument for channel in stereo pair.')
 
-        for dst in self._dsts:
-            if dst[0] == output:
-                break
-        for src in self._srcs:
-            if src[0] == input:
-                break
+        dst = nodes['dst-ports'][output]
+        src = nodes['src-ports'][input]
 
         gains = []
         total = 0
@@ -370,6 +715,7 @@ class DiceExtendedUnit(DiceUnit):
         for gain in gains:
             ExtMixerSpace.write_gain(self._protocol, req, gain['dst-ch'],
                                      gain['src-ch'], gain['val'])
+        self.get_invalidator().invalidate('mixer')
 
     def get_mixer_gain(self, output, input, ch):
         req = Hinawa.FwReq.new()
@@ -386,6 +732,7 @@ class DiceExtendedUnit(DiceUnit):
         for gain in gains:
             ExtMixerSpace.write_gain(self._protocol, req, gain['dst-ch'],
                                      gain['src-ch'], gain['val'])
+        self.get_invalidator().invalidate('mixer')
 
     def get_mixer_balance(self, output, input, ch):
         req = Hinawa.FwReq.new()
@@ -397,6 +744,63 @@ class DiceExtendedUnit(DiceUnit):
             balance = float(100 * gains[1]['val'] // total)
         return balance
 
+    def __load_mixer_matrix(self):
+        req = Hinawa.FwReq.new()
+        gains = ExtMixerSpace.read_gains(self._protocol, req)
+        return tuple(tuple(row) for row in gains)
+
+    def get_mixer_matrix(self, refresh=False):
+        # Read the coefficients again when refresh is set, to see changes by
+        # the other programs.
+        if refresh:
+            self.get_invalidator().invalidate('mixer')
+        matrix = self.get_invalidator().get('mixer')
+        return [list(row) for row in matrix]
+
+    def set_mixer_matrix(self, matrix, refresh=False):
+        if refresh:
+            self.get_invalidator().invalidate('mixer')
+        curr = self.get_invalidator().get('mixer')
+        if len(matrix) != len(curr):
+            raise ValueError('Invalid argument for the number of outputs.')
+        if len(curr) == 0:
+            return
+        inputs = len(curr[0])
+        for row in matrix:
+            if len(row) != inputs:
+                raise ValueError('Invalid argument for the number of inputs.')
+            for val in row:
+                if val < 0 or val > 0xffff:
+                    raise ValueError('Invalid argument for coefficient.')
+
+        prev = [val for row in curr for val in row]
+        vals = [val for row in matrix for val in row]
+
+        # Detect successive runs of changed coefficients.
+        runs = []
+        start = None
+        for i, val in enumerate(vals):
+            if val != prev[i]:
+                if start is None:
+                    start = i
+            elif start is not None:
+                runs.append((start, i))
+                start = None
+        if start is not None:
+            runs.append((start, len(vals)))
+
+        req = Hinawa.FwReq.new()
+        try:
+            for start, end in runs:
+                ExtMixerSpace.write_gains(self._protocol, req, start // inputs,
+                                          start % inputs, vals[start:end])
+        except Exception:
+            self.get_invalidator().invalidate('mixer')
+            raise
+
+        self.get_invalidator().update('mixer',
+                                      tuple(tuple(row) for row in matrix))
+
     def get_mixer_saturations(self):
         outputs = self.get_mixer_output_labels()
 
@@ -414,33 +818,117 @@ class DiceExtendedUnit(DiceUnit):
             mixer_saturations[label][i % 2] = saturation
         return mixer_saturations
 
-    def get_metering(self):
+    def get_metering(self, deadline=None):
         meters = {}
 
         req = Hinawa.FwReq.new()
-        for peak in ExtPeakSpace.get(self._protocol, req):
-            for src in self._srcs:
-                if peak['src-blk'] == src[1] and peak['src-ch'] in src[2]:
-                    break
-            else:
+        with self.get_scheduler().classify('metering', deadline):
+            peaks = ExtPeakSpace.get(self._protocol, req)
+        nodes = self.get_invalidator().get('router')
+        srcs = nodes['src-index']
+        dsts = nodes['dst-index']
+        for peak in peaks:
+            src = srcs.get((peak['src-blk'], peak['src-ch']))
+            if src is None:
                 continue
-            for dst in self._dsts:
-                if peak['dst-blk'] == dst[1] and peak['dst-ch'] in dst[2]:
-                    break
-            else:
+            dst = dsts.get((peak['dst-blk'], peak['dst-ch']))
+            if dst is None:
                 continue
 
-            src_index = src[2].index(peak['src-ch'])
-            dst_index = dst[2].index(peak['dst-ch'])
+            src_label, src_index = src
+            dst_label, dst_index = dst
 
-            if src[0] not in meters:
-                meters[src[0]] = {0: {}, 1: {}}
-            if dst[0] not in meters[src[0]][src_index]:
-                meters[src[0]][src_index][dst[0]] = {0: 0, 1: 0}
-            meters[src[0]][src_index][dst[0]][dst_index] = peak['peak']
+            if src_label not in meters:
+                meters[src_label] = {0: {}, 1: {}}
+            if dst_label not in meters[src_label][src_index]:
+                meters[src_label][src_index][dst_label] = {0: 0, 1: 0}
+            meters[src_label][src_index][dst_label][dst_index] = peak['peak']
 
         return meters
 
+    def __layout_metering(self, routes):
+        nodes = self.get_invalidator().get('router')
+        srcs = nodes['src-index']
+        dsts = nodes['dst-index']
+        slots = []
+        channels = []
+        for i, route in enumerate(routes):
+            entry = ExtNewRouterSpace.parse_entry_data(
+                                        bytes((route >> 8, route & 0xff)))
+            src = srcs.get((entry['src-blk'], entry['src-ch']))
+            if src is None:
+                continue
+            dst = dsts.get((entry['dst-blk'], entry['dst-ch']))
+            if dst is None:
+                continue
+            slots.append(i)
+            channels.append(src + dst)
+        return tuple(slots), tuple(channels)
+
+    def generate_metering(self, rate=60, decimation=1, peak_hold=0.0,
+                          deadline=None):
+        # Yield a pair of channels and peaks per the given rate in Hz. The
+        # channels is a tuple of (src-label, src-index, dst-label, dst-index)
+        # and changed only when the router is reconfigured. The peaks is a list
+        # in the same order, which is reused for next yield. The highest peak
+        # during decimated ticks is yielded, and held for peak_hold seconds.
+        if rate <= 0 or decimation < 1 or peak_hold < 0:
+            raise ValueError('Invalid argument for metering.')
+        interval = 1 / rate
+        length = self._protocol._ext_layout['peak']['length']
+        fmt = Struct('>{0}I'.format(length // 4))
+
+        req = Hinawa.FwReq.new()
+        routes = None
+        slots = ()
+        channels = ()
+        peaks = []
+        holds = []
+        expires = []
+        tick = 0
+        due = monotonic()
+
+        while True:
+            with self.get_scheduler().classify('metering', deadline):
+                data = ExtPeakSpace.read_data(self._protocol, req)
+            quads = fmt.unpack_from(data)
+
+            # The order of entries follows current router configuration.
+            curr = tuple(quad & 0xffff for quad in quads)
+            if curr != routes:
+                routes = curr
+                slots, channels = self.__layout_metering(routes)
+                peaks = [0] * len(slots)
+                holds = [0] * len(slots)
+                expires = [0.0] * len(slots)
+                tick = 0
+
+            now = monotonic()
+            for i, slot in enumerate(slots):
+                peak = quads[slot] >> 16
+                if tick == 0 or peak > peaks[i]:
+                    peaks[i] = peak
+            tick += 1
+
+            if tick >= decimation:
+                tick = 0
+                if peak_hold > 0:
+                    for i, peak in enumerate(peaks):
+                        if peak >= holds[i] or expires[i] <= now:
+                            holds[i] = peak
+                            expires[i] = now + peak_hold
+                        else:
+                            peaks[i] = holds[i]
+                yield channels, peaks
+
+            # Skip ticks already passed to keep the rate.
+            due += interval
+            now = monotonic()
+            if due < now:
+                due = now
+            else:
+                sleep(due - now)
+
     def set_standalone_clock_source(self, source):
         req = Hinawa.FwReq.new()
         labels = self._protocol.get_clock_source_names()
@@ -9,6 +9,10 @@ gi.require_version('Hinawa', '4.0')
 gi.require_version('Hitaki', '0.0')
 from gi.repository import GLib, Hinawa, Hitaki
 
+from hinawa_utils.misc.trx_scheduler import TrxScheduler
+from hinawa_utils.misc.cache_invalidator import CacheInvalidator
+from hinawa_utils.misc.notification_worker import NotificationWorker
+
 from hinawa_utils.dice.tcat_protocol_general import TcatProtocolGeneral
 from hinawa_utils.ta1394.config_rom_parser import Ta1394ConfigRomParser
 
@@ -16,6 +20,10 @@ __all__ = ['DiceUnit']
 
 
 class DiceUnit(Hitaki.SndDice):
+    # The number of transactions outstanding at once. Models which tolerate
+    # concurrent transactions can override it.
+    CONCURRENT_TRANSACTIONS = 1
+
     def __init__(self, path):
         super().__init__()
         self.open(path, 0)
@@ -44,11 +52,31 @@ class DiceUnit(Hitaki.SndDice):
         info = parser.parse_rom(image)
         self.vendor_id = info['vendor-id']
         self.model_id = info['model-id']
+        self.max_rec = info['bus-info']['max_rec']
+        # The field is available since IEEE 1394:2008.
+        self.link_spd = info['bus-info'].get('link_spd')
+
+        # Any transaction to the unit is arbitrated according to its category.
+        self.__scheduler = TrxScheduler(self.CONCURRENT_TRANSACTIONS)
+
+        # Cached state of the unit is invalidated by events.
+        self.__invalidator = CacheInvalidator()
+        self.__invalidator.attach_node(self.__node)
 
         req = Hinawa.FwReq.new()
         self._protocol = TcatProtocolGeneral(self, req)
 
+        # Bursts of notification are coalesced to invalidate and refresh
+        # affected caches. The invalidation is registered at first.
+        self.__worker = NotificationWorker()
+        self.__invalidator.attach_unit(self, self.__worker)
+        self.__worker.register(
+            self._protocol._GLOBAL_NOTIFY_MASK,
+            lambda msg: self.__invalidator.get('global-section'))
+        self.connect('notified', lambda unit, msg: self.__worker.post(msg))
+
     def release(self):
+        self.__worker.stop()
         self.__unit_dispatcher.quit()
         self.__node_dispatcher.quit()
         self.__unit_th.join()
@@ -63,6 +91,15 @@ class DiceUnit(Hitaki.SndDice):
     def get_node(self):
         return self.__node
 
+    def get_scheduler(self):
+        return self.__scheduler
+
+    def get_invalidator(self):
+        return self.__invalidator
+
+    def get_notification_worker(self):
+        return self.__worker
+
     def get_owner_addr(self):
         req = Hinawa.FwReq.new()
         return self._protocol.read_owner_addr(req)
@@ -159,3 +196,28 @@ class DiceUnit(Hitaki.SndDice):
     def get_external_sync_adat_status(self):
         req = Hinawa.FwReq.new()
         return self._protocol.read_external_sync_adat_status(req)
+
+    def get_external_sync_status(self):
+        req = Hinawa.FwReq.new()
+        return self._protocol.read_external_sync_status(req)
+
+    def watch_external_sync_status(self, interval=1.0):
+        # Yield whole the status at first, then changed fields only. The
+        # status is read again when any notification arrives, or the interval
+        # in second elapses since some models don't notify it.
+        req = Hinawa.FwReq.new()
+        protocol = self._protocol
+        serial = protocol.get_notification_serial()
+        prev = protocol.read_external_sync_status(req)
+        yield dict(prev)
+
+        while True:
+            serial = protocol.wait_notification(serial, interval)
+            curr = protocol.read_external_sync_status(req)
+            changes = {}
+            for key, val in curr.items():
+                if prev[key] != val:
+                    changes[key] = val
+            if len(changes) > 0:
+                prev = curr
+                yield changes
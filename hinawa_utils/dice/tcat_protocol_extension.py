@@ -2,7 +2,7 @@
 # Copyright (C) 2018 Takashi Sakamoto
 
 from struct import unpack, pack
-from time import sleep
+from time import monotonic
 from math import log10, pow
 
 __all__ = ['ExtCtlSpace', 'ExtCapsSpace', 'ExtCmdSpace', 'ExtMixerSpace',
@@ -144,6 +144,11 @@ class ExtCmdSpace():
     _RETURN_SUCCESS = 0x00
     _RETURN_FAILURE = 0x01
 
+    # In second.
+    _TIMEOUT = 2.0
+    _MINIMUM_INTERVAL = 0.0005
+    _MAXIMUM_INTERVAL = 0.1
+
     _OP_CODES = (
         'noop',
         'load-from-router',
@@ -180,20 +185,25 @@ class ExtCmdSpace():
         data[1] = cls._RATE_MODES[mode]
         data[3] = cls._OP_CODES.index(cmd)
 
+        serial = protocol.get_notification_serial()
         ExtCtlSpace.write_section(
             protocol, req, 'cmd', cls._OFFSET_OPCODE, data)
 
-        # Completion is notified as clearing of bit flags in the register.
-        count = 10
-        while count > 0:
+        # Completion is notified as clearing of bit flags in the register. The
+        # register is checked again at notification from the unit, or at
+        # exponentially growing interval.
+        deadline = monotonic() + cls._TIMEOUT
+        interval = cls._MINIMUM_INTERVAL
+        while True:
             data = ExtCtlSpace.read_section(protocol, req, 'cmd',
                                             cls._OFFSET_OPCODE, 4)
             if not (data[0] & cls._EXECUTE_FLAG):
                 break
-            count -= 1
-            sleep(0.2)
-        else:
-            raise IOError('Timeout of command initiation.')
+            remain = deadline - monotonic()
+            if remain <= 0:
+                raise IOError('Timeout of command initiation.')
+            serial = protocol.wait_notification(serial, min(interval, remain))
+            interval = min(interval * 2, cls._MAXIMUM_INTERVAL)
 
         data = ExtCtlSpace.read_section(protocol, req, 'cmd',
                                         cls._OFFSET_RETURN, 4)
@@ -283,6 +293,43 @@ class ExtMixerSpace():
 
         return unpack('>H', data[2:4])[0]
 
+    @classmethod
+    def read_gains(cls, protocol, req):
+        if not protocol._ext_caps['mixer']['is-exposed']:
+            raise IOError('This feature is not available.')
+
+        outputs = protocol._ext_caps['mixer']['output-channels']
+        inputs = protocol._ext_caps['mixer']['input-channels']
+        if 4 + outputs * inputs * 4 > protocol._ext_layout['mixer']['length']:
+            raise OSError('Inconsistency between channels and length of space')
+
+        # All of coefficients in one block read.
+        data = ExtCtlSpace.read_section(protocol, req, 'mixer', 4,
+                                        outputs * inputs * 4)
+        quads = unpack('>{0}I'.format(outputs * inputs), data)
+
+        gains = []
+        for out_ch in range(outputs):
+            row = quads[out_ch * inputs:(out_ch + 1) * inputs]
+            gains.append([quad & 0xffff for quad in row])
+        return gains
+
+    @classmethod
+    def write_gains(cls, protocol, req, out_ch, in_ch, vals):
+        if not protocol._ext_caps['mixer']['is-exposed']:
+            raise IOError('This feature is not available.')
+
+        # The coefficients are successive in the order of output and input.
+        offset = cls._calcurate_offset(protocol, out_ch, in_ch)
+        outputs = protocol._ext_caps['mixer']['output-channels']
+        inputs = protocol._ext_caps['mixer']['input-channels']
+        if offset + len(vals) * 4 > 4 + outputs * inputs * 4:
+            raise ValueError('Invalid argument for the number of values')
+
+        data = pack('>{0}I'.format(len(vals)), *vals)
+
+        return ExtCtlSpace.write_section(protocol, req, 'mixer', offset, data)
+
 # '3.6 New router space'
 
 
@@ -396,13 +443,18 @@ class ExtNewRouterSpace():
 
 class ExtPeakSpace():
     @classmethod
-    def get(cls, protocol, req):
+    def read_data(cls, protocol, req):
+        # Each quadlet consists of peak in upper 16 bits and router entry in
+        # lower 16 bits.
         if not protocol._ext_caps['general']['peak-available']:
             raise IOError('This feature is not available.')
+        length = protocol._ext_layout['peak']['length']
+        return ExtCtlSpace.read_section(protocol, req, 'peak', 0, length)
 
+    @classmethod
+    def get(cls, protocol, req):
         entries = []
-        length = protocol._ext_layout['peak']['length']
-        data = ExtCtlSpace.read_section(protocol, req, 'peak', 0, length)
+        data = cls.read_data(protocol, req)
         for i in range(0, len(data), 4):
             entry = ExtNewRouterSpace.parse_entry_data(data[2:4])
             entry['peak'] = unpack('>H', data[0:2])[0]
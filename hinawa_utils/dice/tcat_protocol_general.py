@@ -1,7 +1,12 @@
 # SPDX-License-Identifier: LGPL-3.0-or-later
 # Copyright (C) 2018 Takashi Sakamoto
 
-from struct import unpack
+from struct import unpack, unpack_from
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition
+from json import load, dump
+from pathlib import Path
 
 import gi
 gi.require_version('Hinawa', '4.0')
@@ -13,6 +18,11 @@ __all__ = ['TcatProtocolGeneral']
 class TcatProtocolGeneral():
     _BASE_ADDR = 0xffffe0000000
     _MAXIMUM_TRX_LENGTH = 512
+
+    # The maximum payload of asynchronous packet for speed code; S100, S200,
+    # S400 and S800.
+    _MAXIMUM_PAYLOADS = (512, 1024, 2048, 4096)
+    _DEFAULT_SPEED = 2
     RATE_BITS = {
         0x00:   32000,
         0x01:   44100,
@@ -43,55 +53,166 @@ class TcatProtocolGeneral():
         0x0c:   'internal',
     }
 
+    # Bits in notification.
+    NOTIFY_RX_CFG_CHG = 0x00000001
+    NOTIFY_TX_CFG_CHG = 0x00000002
+    NOTIFY_LOCK_CHG = 0x00000010
+    NOTIFY_CLOCK_ACCEPTED = 0x00000020
+    NOTIFY_EXT_STATUS = 0x00000040
+
+    # Bits in notification to change global section.
+    _GLOBAL_NOTIFY_MASK = (NOTIFY_LOCK_CHG | NOTIFY_CLOCK_ACCEPTED |
+                           NOTIFY_EXT_STATUS)
+
     def __init__(self, unit, req):
         self._unit = unit
 
-        self._general_layout = self._detect_address_space(req)
-        self._version = self._parse_dice_version(req)
-        self._clock_source_labels = self._parse_clock_source_names(req)
-        self._sampling_rates, self._clock_sources = self._parse_clock_caps(req)
+        # Count notifications to wake up threads waiting for them.
+        self.__notified = Condition()
+        self.__notification_serial = 0
+        unit.connect('notified', self.__handle_notification)
+
+        # The maximum payload of block request is restricted by node, and by
+        # speed of link. ASICs of DICE are on S400 link.
+        speed = unit.link_spd
+        if speed is None or speed >= len(self._MAXIMUM_PAYLOADS):
+            speed = self._DEFAULT_SPEED
+        if unit.max_rec > 0:
+            self._max_chunk = min(unit.max_rec, self._MAXIMUM_PAYLOADS[speed])
+        else:
+            self._max_chunk = self._MAXIMUM_TRX_LENGTH
+        self.__read_frame = bytes(self._max_chunk)
+
+        # Names of channels in stream rarely change, thus decoded ones are
+        # reused for the same bytes.
+        self.__formations = {}
+
+        # The layout can be changed by firmware update after bus reset.
+        unit.get_invalidator().register('general-layout',
+                                        self.__load_address_space,
+                                        ('bus-update', 'disconnected'))
+
+        # Getters for global section are served by mirror of the section,
+        # which is fetched in one transaction.
+        unit.get_invalidator().register('global-section',
+                                        self.__load_global_section,
+                                        ('bus-update', 'disconnected',
+                                         'notified'),
+                                        self._GLOBAL_NOTIFY_MASK)
+
+        # Capabilities never change for the same firmware, thus cached per
+        # GUID and validated by the version register.
+        guid = unit.get_property('guid')
+        self.__caps_path = Path('/tmp/hinawa-{0:08x}-caps'.format(guid))
+        caps = self.__load_caps_cache(req)
+        if caps is not None:
+            self._caps_cache = caps
+            unit.get_invalidator().update('general-layout',
+                                          caps['general-layout'])
+            self._version = caps['version']
+            self._clock_source_labels = caps['clock-source-names']
+            self._sampling_rates = caps['sampling-rates']
+            self._clock_sources = caps['clock-sources']
+        else:
+            unit.get_invalidator().update('general-layout',
+                                          self._detect_address_space(req))
+            self._version = self._parse_dice_version(req)
+            self._clock_source_labels = self._parse_clock_source_names(req)
+            self._sampling_rates, self._clock_sources = \
+                self._parse_clock_caps(req)
+            caps = {
+                'general-layout':       self._general_layout,
+                'version':              self._version,
+                'clock-source-names':   self._clock_source_labels,
+                'sampling-rates':       self._sampling_rates,
+                'clock-sources':        self._clock_sources,
+            }
+            self._caps_cache = caps
+            self._save_caps_cache()
 
-    def write_transactions(self, req, offset, data):
-        addr = self._BASE_ADDR + offset
+    def __handle_notification(self, unit, msg):
+        with self.__notified:
+            self.__notification_serial += 1
+            self.__notified.notify_all()
 
-        length = len(data)
+    def get_notification_serial(self):
+        with self.__notified:
+            return self.__notification_serial
 
-        while length > 0:
-            count = length
-            if count > self._MAXIMUM_TRX_LENGTH:
-                count = self._MAXIMUM_TRX_LENGTH
-            if count == 4:
-                tcode = Hinawa.FwTcode.WRITE_QUADLET_REQUEST
-            else:
-                tcode = Hinawa.FwTcode.WRITE_BLOCK_REQUEST
-            _, _ = req.transaction(self._unit.get_node(), tcode, addr, count,
-                                   data[0:count], 100)
-            data = data[count:]
-            length -= count
-            addr += count
+    def wait_notification(self, serial, timeout):
+        # Return immediately when any notification arrived after the serial.
+        with self.__notified:
+            self.__notified.wait_for(
+                lambda: self.__notification_serial != serial, timeout)
+            return self.__notification_serial
 
-    def read_transactions(self, req, offset, length):
-        data = bytearray()
+    def write_transactions(self, req, offset, data):
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data)
+        view = memoryview(data)
 
-        addr = self._BASE_ADDR + offset
+        chunks = self.__split_chunks(offset, len(view))
+        self.__execute_chunks(req, self.__write_chunk, view, chunks)
 
-        while len(data) < length:
-            count = length
-            if count > self._MAXIMUM_TRX_LENGTH:
-                count = self._MAXIMUM_TRX_LENGTH
-            if count == 4:
-                tcode = Hinawa.FwTcode.READ_QUADLET_REQUEST
-            else:
-                tcode = Hinawa.FwTcode.READ_BLOCK_REQUEST
-            frames = bytearray(count)
-            _, frames = req.transaction(self._unit.get_node(), tcode, addr, count,
-                                        frames, 100)
-            data.extend(frames)
-            length -= count
-            addr += count
+    def read_transactions(self, req, offset, length):
+        data = bytearray(length)
+        view = memoryview(data)
+
+        chunks = self.__split_chunks(offset, length)
+        self.__execute_chunks(req, self.__read_chunk, view, chunks)
 
         return data
 
+    def __split_chunks(self, offset, length):
+        chunks = []
+        addr = self._BASE_ADDR + offset
+        pos = 0
+        while pos < length:
+            count = min(length - pos, self._max_chunk)
+            chunks.append((addr + pos, pos, count))
+            pos += count
+        return chunks
+
+    def __execute_chunks(self, req, handle, view, chunks):
+        concurrency = self._unit.CONCURRENT_TRANSACTIONS
+        if concurrency < 2 or len(chunks) < 2:
+            for chunk in chunks:
+                handle(req, view, *chunk)
+            return
+
+        # Independent chunks are issued concurrently, with own FwReq for each.
+        handle = self._unit.get_scheduler().inherit(handle)
+        with ThreadPoolExecutor(concurrency) as executor:
+            futures = [executor.submit(handle, Hinawa.FwReq.new(), view, *chunk)
+                       for chunk in chunks]
+            for future in futures:
+                future.result()
+
+    def __write_chunk(self, req, view, addr, pos, count):
+        if count == 4:
+            tcode = Hinawa.FwTcode.WRITE_QUADLET_REQUEST
+        else:
+            tcode = Hinawa.FwTcode.WRITE_BLOCK_REQUEST
+        _, _ = self._unit.get_scheduler().execute(
+            req.transaction, self._unit.get_node(), tcode, addr, count,
+            view[pos:pos + count], 100)
+
+    def __read_chunk(self, req, view, addr, pos, count):
+        if count == 4:
+            tcode = Hinawa.FwTcode.READ_QUADLET_REQUEST
+        else:
+            tcode = Hinawa.FwTcode.READ_BLOCK_REQUEST
+        # PyGObject copies response frame to new object, thus the frame given
+        # to the transaction is shared for the chunk with maximum length.
+        if count == len(self.__read_frame):
+            frames = self.__read_frame
+        else:
+            frames = bytes(count)
+        _, frames = self._unit.get_scheduler().execute(
+            req.transaction, self._unit.get_node(), tcode, addr, count,
+            frames, 100)
+        view[pos:pos + count] = frames
+
     def _read_section_offset(self, req, section, offset, length):
         offset += self._general_layout[section]['offset']
         return self.read_transactions(req, offset, length)
@@ -100,6 +221,69 @@ class TcatProtocolGeneral():
         offset += self._general_layout[section]['offset']
         self.write_transactions(req, offset, data)
 
+    @property
+    def _general_layout(self):
+        return self._unit.get_invalidator().get('general-layout')
+
+    def __load_caps_cache(self, req):
+        try:
+            with self.__caps_path.open(mode='r') as f:
+                caps = load(f)
+            layout = caps['general-layout']
+            version = caps['version']
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+        # The version register is not available in the former protocol.
+        if layout['global']['length'] < 0x64:
+            return None
+        offset = layout['global']['offset'] + 0x60
+        data = self.read_transactions(req, offset, 4)
+        if '{0}.{1}.{2}.{3}'.format(*data) != version:
+            return None
+        return caps
+
+    def _save_caps_cache(self):
+        # MEMO: the cache is just rebuilt at next time when failing.
+        if self._version == '1.0.2':
+            return
+        try:
+            with self.__caps_path.open(mode='w+') as f:
+                dump(self._caps_cache, f)
+        except OSError:
+            pass
+
+    def __load_address_space(self):
+        req = Hinawa.FwReq.new()
+        return self._detect_address_space(req)
+
+    def __load_global_section(self):
+        req = Hinawa.FwReq.new()
+        length = self._general_layout['global']['length']
+        with self._unit.get_scheduler().classify('refresh'):
+            return bytes(self._read_section_offset(req, 'global', 0, length))
+
+    def refresh_global_section(self):
+        self._unit.get_invalidator().invalidate('global-section')
+        self._unit.get_invalidator().get('global-section')
+
+    def _read_global_offset(self, req, offset, length):
+        mirror = self._unit.get_invalidator().get('global-section')
+        if offset + length > len(mirror):
+            return self._read_section_offset(req, 'global', offset, length)
+        return bytearray(mirror[offset:offset + length])
+
+    def _write_global_offset(self, req, offset, data):
+        self._write_section_offset(req, 'global', offset, data)
+        self.__update_global_section(offset, data)
+
+    def __update_global_section(self, offset, data):
+        invalidator = self._unit.get_invalidator()
+        mirror = bytearray(invalidator.get('global-section'))
+        if offset + len(data) <= len(mirror):
+            mirror[offset:offset + len(data)] = data
+            invalidator.update('global-section', bytes(mirror))
+
     def _detect_address_space(self, req):
         PARAMS = (
             ('global',  40, 0x60),
@@ -123,17 +307,34 @@ class TcatProtocolGeneral():
         return layout
 
     def _parse_string_bytes(self, data):
-        letters = bytearray()
-
-        for i in range(0, len(data), 4):
-            letters.extend(list(reversed(data[0:4])))
-            data = data[4:]
-
-        return letters.decode('utf-8').rstrip('\0')
+        # The string is aligned to quadlet in little endian.
+        quads = array('I', bytes(data))
+        quads.byteswap()
+        return quads.tobytes().decode('utf-8').rstrip('\0')
+
+    def __parse_formation(self, data, count):
+        key = (bytes(data), count)
+        if key not in self.__formations:
+            names = self._parse_string_bytes(data).split('\\')[0:count]
+            self.__formations[key] = tuple(names)
+        return list(self.__formations[key])
+
+    def __read_stream_section(self, req, section):
+        # Fetch whole the section at once, then split it per stream.
+        length = self._general_layout[section]['length']
+        data = self._read_section_offset(req, section, 0x00, max(length, 8))
+        count, length = unpack_from('>2I', data)
+        length *= 4
+        if 0x08 + length * count > len(data):
+            data = self._read_section_offset(req, section, 0x00,
+                                             0x08 + length * count)
+        view = memoryview(data)
+        return [view[0x08 + length * i:0x08 + length * (i + 1)]
+                for i in range(count)]
 
     # GLOBAL_OWNER: global:0x00
     def read_owner_addr(self, req):
-        data = self._read_section_offset(req, 'global', 0x00, 8)
+        data = self._read_global_offset(req, 0x00, 8)
         return (unpack('>I', data[0:4])[0] << 32) | unpack('>I', data[4:8])[0]
 
     # GLOBAL_NOTIFICATION: global:0x08
@@ -154,16 +355,18 @@ class TcatProtocolGeneral():
             data.extend(list(reversed(letters[0:4])))
             letters = letters[4:]
 
-        self._write_section_offset(req, 'global', 0x0c, data)
+        self._write_global_offset(req, 0x0c, data)
 
     def read_nickname(self, req):
-        data = self._read_section_offset(req, 'global', 0x0c, 64)
+        data = self._read_global_offset(req, 0x0c, 64)
         return self._parse_string_bytes(data).rstrip()
 
     def _clock_select_transaction(self, data):
         quads = unpack('>I', data)
         offset = self._general_layout['global']['offset'] + 0x4c
-        self._unit.transaction(self._BASE_ADDR + offset, quads, 0x00000020)
+        self._unit.get_scheduler().execute(
+            self._unit.transaction, self._BASE_ADDR + offset, quads, 0x00000020)
+        self.__update_global_section(0x4c, data)
 
     # GLOBAL_CLOCK_SELECT: global:004c
     def get_supported_clock_sources(self):
@@ -174,13 +377,13 @@ class TcatProtocolGeneral():
             raise ValueError('Invalid argument for clock source.')
         val = {v: k for k, v in self.CLOCK_BITS.items()}[source]
 
-        data = self._read_section_offset(req, 'global', 0x4c, 4)
+        data = self._read_global_offset(req, 0x4c, 4)
         if data[3] != val:
             data[3] = val
             self._clock_select_transaction(data)
 
     def read_clock_source(self, req):
-        data = self._read_section_offset(req, 'global', 0x4c, 4)
+        data = self._read_global_offset(req, 0x4c, 4)
         val = data[3]
         if (val not in self.CLOCK_BITS or
                 self._clock_source_labels[val] == 'Unused'):
@@ -202,13 +405,13 @@ class TcatProtocolGeneral():
             else:
                 raise ValueError('Invalid argument for sampling rate.')
 
-        data = self._read_section_offset(req, 'global', 0x4c, 4)
+        data = self._read_global_offset(req, 0x4c, 4)
         if data[2] != index:
             data[2] = index
             self._clock_select_transaction(data)
 
     def read_sampling_rate(self, req):
-        data = self._read_section_offset(req, 'global', 0x4c, 4)
+        data = self._read_global_offset(req, 0x4c, 4)
         index = data[2]
         if index in self.RATE_BITS:
             return self.RATE_BITS[index]
@@ -219,14 +422,14 @@ class TcatProtocolGeneral():
 
     # GLOBAL_ENABLE: global:0x50
     def read_enabled(self, req):
-        data = self._read_section_offset(req, 'global', 0x50, 4)
+        data = self._read_global_offset(req, 0x50, 4)
         return bool(unpack('>I', data))
 
     # GLOBAL_STATUS: global:0x54
     def read_clock_status(self, req):
         status = {}
 
-        data = self._read_section_offset(req, 'global', 0x54, 4)
+        data = self._read_global_offset(req, 0x54, 4)
         status['locked'] = bool(data[3])
         status['rate'] = self.RATE_BITS[data[2]]
 
@@ -252,7 +455,7 @@ class TcatProtocolGeneral():
             'slipped':  [],
         }
 
-        data = self._read_section_offset(req, 'global', 0x58, 4)
+        data = self._read_global_offset(req, 0x58, 4)
 
         slipped_mask = unpack('>H', data[0:2])[0]
         locked_mask = unpack('>H', data[2:4])[0]
@@ -265,14 +468,14 @@ class TcatProtocolGeneral():
 
     # GLOBAL_SAMPLE_RATE: global:0x5c
     def read_measured_sampling_rate(self, req):
-        data = self._read_section_offset(req, 'global', 0x5c, 4)
+        data = self._read_global_offset(req, 0x5c, 4)
         return unpack('>I', data)[0]
 
     # GLOBAL_VERSION: global:0x60
     def _parse_dice_version(self, req):
         if self._general_layout['global']['length'] < 0x64:
             return '1.0.2'
-        data = self._read_section_offset(req, 'global', 0x60, 4)
+        data = self._read_global_offset(req, 0x60, 4)
         return '{0}.{1}.{2}.{3}'.format(data[0], data[1], data[2], data[3])
 
     def get_dice_version(self):
@@ -286,7 +489,7 @@ class TcatProtocolGeneral():
         if self._version == '1.0.2':
             return [44100, 48000], ['arx1', 'internal']
 
-        data = self._read_section_offset(req, 'global', 0x64, 4)
+        data = self._read_global_offset(req, 0x64, 4)
 
         flags = unpack('>H', data[0:2])[0]
         for index, name in self.CLOCK_BITS.items():
@@ -313,7 +516,7 @@ class TcatProtocolGeneral():
                 else:
                     names.append('Unused')
             return names
-        data = self._read_section_offset(req, 'global', 0x68, 256)
+        data = self._read_global_offset(req, 0x68, 256)
         return self._parse_string_bytes(data).split('\\')[0:-2]
 
     def get_clock_source_names(self):
@@ -322,26 +525,20 @@ class TcatProtocolGeneral():
     # TX stream settings.
     def read_tx_params(self, req):
         params = []
-        data = self._read_section_offset(req, 'tx', 0x00, 8)
-        count = unpack('>I', data[0:4])[0]
-        length = unpack('>I', data[4:8])[0] * 4
-        for i in range(count):
-            offset = 0x08 + length * i
-            data = self._read_section_offset(req, 'tx', offset, length)
-            pcm_count = unpack('>I', data[4:8])[0]
-            pcm_formation = self._parse_string_bytes(data[16:272])
-            pcm_formation = pcm_formation.split('\\')[0:pcm_count]
+        for data in self.__read_stream_section(req, 'tx'):
+            iso_channel, pcm_count, midi, speed = unpack_from('>4I', data)
             stream = {
-                'iso-channel': unpack('>I', data[0:4])[0],
+                'iso-channel': iso_channel,
                 'pcm':         pcm_count,
-                'midi':        unpack('>I', data[8:12])[0],
-                'speed':       unpack('>I', data[12:16])[0],
-                'formation':   pcm_formation,
+                'midi':        midi,
+                'speed':       speed,
+                'formation':   self.__parse_formation(data[16:272], pcm_count),
             }
-            if length >= 280:
+            if len(data) >= 280:
+                caps, enable = unpack_from('>2I', data, 272)
                 stream['iec60958'] = {
-                    'caps':    unpack('>I', data[272:276])[0],
-                    'enable':  unpack('>I', data[276:280])[0],
+                    'caps':    caps,
+                    'enable':  enable,
                 }
             params.append(stream)
         return params
@@ -349,26 +546,20 @@ class TcatProtocolGeneral():
     # RX stream settings.
     def read_rx_params(self, req):
         params = []
-        data = self._read_section_offset(req, 'rx', 0x00, 8)
-        count = unpack('>I', data[0:4])[0]
-        length = unpack('>I', data[4:8])[0] * 4
-        for i in range(count):
-            offset = 0x08 + length * i
-            data = self._read_section_offset(req, 'rx', offset, length)
-            pcm_count = unpack('>I', data[8:12])[0]
-            pcm_formation = self._parse_string_bytes(data[16:272])
-            pcm_formation = pcm_formation.split('\\')[0:pcm_count]
+        for data in self.__read_stream_section(req, 'rx'):
+            iso_channel, start, pcm_count, midi = unpack_from('>4I', data)
             stream = {
-                'iso-channel':  unpack('>I', data[0:4])[0],
-                'start':        unpack('>I', data[4:8])[0],
+                'iso-channel':  iso_channel,
+                'start':        start,
                 'pcm':          pcm_count,
-                'midi':         unpack('>I', data[12:16])[0],
-                'formation':    pcm_formation,
+                'midi':         midi,
+                'formation':    self.__parse_formation(data[16:272], pcm_count),
             }
-            if length >= 280:
+            if len(data) >= 280:
+                caps, enable = unpack_from('>2I', data, 272)
                 stream['iec60958'] = {
-                    'caps':    unpack('>I', data[272:276])[0],
-                    'enable':  unpack('>I', data[276:280])[0],
+                    'caps':    caps,
+                    'enable':  enable,
                 }
             params.append(stream)
         return params
@@ -411,3 +602,34 @@ class TcatProtocolGeneral():
         if not data[3] & 0x10:
             return 0
         return data[3] & 0xf
+
+    def read_external_sync_status(self, req):
+        status = {
+            'clock-source': '',
+            'locked':       '',
+            'rate':         '',
+            'adat-status':  '',
+        }
+        layout = self._general_layout
+        if 'external' not in layout or layout['external']['length'] == 0:
+            return status
+
+        # All of fields are read at once.
+        data = self._read_section_offset(req, 'external', 0x00, 16)
+        src, locked, rate = unpack_from('>3I', data)
+
+        if (src not in self.CLOCK_BITS or
+                self._clock_source_labels[src] == 'Unused'):
+            status['clock-source'] = ''
+        else:
+            status['clock-source'] = self.CLOCK_BITS[src]
+        status['locked'] = bool(locked)
+        if rate not in self.RATE_BITS:
+            raise OSError('Unexpected return value for sampling rate.')
+        status['rate'] = self.RATE_BITS[rate]
+        if not data[15] & 0x10:
+            status['adat-status'] = 0
+        else:
+            status['adat-status'] = data[15] & 0xf
+
+        return status
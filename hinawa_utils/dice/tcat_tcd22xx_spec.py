@@ -46,11 +46,13 @@ class TcatTcd22xxSpec():
 
         return srcs, dsts
 
-    def _get_available_stream_ports(self, protocol, req, mode):
+    def _get_available_stream_ports(self, protocol, req, mode,
+                                    stream_configs=None):
         STREAMS = ('avs0', 'avs1')
 
-        stream_configs = \
-            ExtCurrentConfigSpace.read_stream_config(protocol, req, mode)
+        if stream_configs is None:
+            stream_configs = \
+                ExtCurrentConfigSpace.read_stream_config(protocol, req, mode)
 
         dsts = []
 
@@ -82,12 +84,14 @@ class TcatTcd22xxSpec():
 
         return srcs, dsts
 
-    def _get_available_virt_ports(self, protocol, req, mode):
+    def _get_available_virt_ports(self, protocol, req, mode,
+                                  stream_configs=None):
         srcs = []
         dsts = []
 
         stream_srcs, stream_dsts = \
-            self._get_available_stream_ports(protocol, req, mode)
+            self._get_available_stream_ports(protocol, req, mode,
+                                             stream_configs)
         srcs.extend(stream_srcs)
         dsts.extend(stream_dsts)
 
@@ -220,7 +224,7 @@ class TcatTcd22xxSpec():
 
         return srcs, dsts
 
-    def get_available_ports(self, protocol, req, mode):
+    def get_available_ports(self, protocol, req, mode, stream_configs=None):
         srcs = []
         dsts = []
 
@@ -245,7 +249,8 @@ class TcatTcd22xxSpec():
         dsts.extend(real_dsts)
 
         virt_srcs, virt_dsts = \
-            self._get_available_virt_ports(protocol, req, mode)
+            self._get_available_virt_ports(protocol, req, mode,
+                                           stream_configs)
         srcs.extend(virt_srcs)
         dsts.extend(virt_dsts)
 
@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: LGPL-3.0-or-later
 # Copyright (C) 2018 Takashi Sakamoto
 
+from array import array
 from threading import Thread
 
 import gi
@@ -9,6 +10,9 @@ gi.require_version('Hinawa', '4.0')
 gi.require_version('Hitaki', '0.0')
 from gi.repository import GLib, Hinawa, Hitaki
 
+from hinawa_utils.misc.trx_scheduler import TrxScheduler
+from hinawa_utils.misc.cache_invalidator import CacheInvalidator
+
 from hinawa_utils.efw.transactions import EftInfo
 from hinawa_utils.efw.transactions import EftHwctl
 from hinawa_utils.efw.transactions import EftPhysOutput
@@ -43,8 +47,21 @@ class EfwUnit(Hitaki.SndEfw):
         self.__node_th = Thread(target=lambda d: d.run(), args=(self.__node_dispatcher, ))
         self.__node_th.start()
 
-        self.info = EftInfo.get_spec(self)
-        self._fixup_info()
+        # Any transaction to the unit is arbitrated according to its category.
+        self.__scheduler = TrxScheduler()
+
+        # The buffer for parameters of response, given to any transaction.
+        self.__params = array('I', [0] * 256)
+
+        # Cached state of the unit is invalidated by events.
+        self.__invalidator = CacheInvalidator()
+        self.__invalidator.attach_node(self.__node)
+        self.__invalidator.attach_unit(self)
+
+        # The hardware information can be changed by firmware update.
+        self.__invalidator.register('info', self.__load_info,
+                                    ('bus-update', 'disconnected'))
+        self.__invalidator.get('info')
 
     def release(self):
         self.__unit_dispatcher.quit()
@@ -61,21 +78,39 @@ class EfwUnit(Hitaki.SndEfw):
     def get_node(self):
         return self.__node
 
-    def _fixup_info(self):
+    def get_scheduler(self):
+        return self.__scheduler
+
+    def get_params_buffer(self):
+        return self.__params
+
+    def get_invalidator(self):
+        return self.__invalidator
+
+    @property
+    def info(self):
+        return self.__invalidator.get('info')
+
+    def __load_info(self):
+        info = EftInfo.get_spec(self)
+        self._fixup_info(info)
+        return info
+
+    def _fixup_info(self, info):
         # Mapping for channels on tx stream is supported by Onyx1200F only.
-        if self.info['model'] == 'Onyx1200F':
-            self.info['features']['tx-mapping'] = True
+        if info['model'] == 'Onyx1200F':
+            info['features']['tx-mapping'] = True
         else:
-            self.info['features']['tx-mapping'] = False
+            info['features']['tx-mapping'] = False
 
         # S/PDIF on coaxial interfae is available in Onyx400F.
-        if self.info['model'] == 'Onyx400F':
-            self.info['features']['spdif-coax'] = True
+        if info['model'] == 'Onyx400F':
+            info['features']['spdif-coax'] = True
 
         # Nominal level of input/output is always supported by AudioFire series.
-        if self.info['model'].find('Audiofire') == 0:
-            self.info['features']['nominal-input'] = True
-            self.info['features']['nominal-output'] = True
+        if info['model'].find('Audiofire') == 0:
+            info['features']['nominal-input'] = True
+            info['features']['nominal-output'] = True
 
     @staticmethod
     def _calcurate_vol_from_db(db):
@@ -91,8 +126,9 @@ class EfwUnit(Hitaki.SndEfw):
         else:
             return 20 * log10(vol / 0x01000000)
 
-    def get_metering(self):
-        return EftInfo.get_metering(self)
+    def get_metering(self, deadline=None):
+        with self.__scheduler.classify('metering', deadline):
+            return EftInfo.get_metering(self)
 
     def set_clock_state(self, rate, src):
         EftHwctl.set_clock(self, rate, src, 0)
@@ -12,6 +12,19 @@ __all__ = ['EftInfo', 'EftFlash', 'EftTransmit', 'EftHwctl', 'EftPhysOutput',
            'EftPhysInput', 'EftPlayback', 'EftCapture', 'EftMonitor',
            'EftIoconf']
 
+
+# Transactions are arbitrated by the scheduler of unit, thus metering requests
+# do not delay operations for control. PyGObject copies parameters of response
+# to new object, thus the buffer of unit is reused for all of calls.
+def _execute_transaction(unit, category, cmd, args):
+    if not isinstance(unit, Hitaki.SndEfw):
+        raise ValueError('Invalid argument for SndEfw')
+    _, params = unit.get_scheduler().execute(unit.transaction, category, cmd,
+                                             args, unit.get_params_buffer(),
+                                             100)
+    return params
+
+
 #
 # Category No.0, for hardware information
 #
@@ -146,11 +159,7 @@ class EftInfo():
 
     @staticmethod
     def _execute_command(unit, cmd, args):
-        if not isinstance(unit, Hitaki.SndEfw):
-            raise ValueError('Invalid argument for SndEfw')
-        params = [0] * 256
-        _, params = unit.transaction(0, cmd, args, params, 100)
-        return params
+        return _execute_transaction(unit, 0, cmd, args)
 
     @classmethod
     def get_spec(cls, unit):
@@ -336,11 +345,7 @@ class EftInfo():
 class EftFlash():
     @staticmethod
     def _execute_command(unit, cmd, args):
-        if not isinstance(unit, Hitaki.SndEfw):
-            raise ValueError('Invalid argument for SndEfw')
-        params = [0] * 256
-        _, params = unit.transaction(1, cmd, args, params, 100)
-        return params
+        return _execute_transaction(unit, 1, cmd, args)
 
     @classmethod
     def erase(cls, unit, offset):
@@ -402,11 +407,7 @@ class EftTransmit():
 
     @staticmethod
     def _execute_command(unit, cmd, args):
-        if not isinstance(unit, Hitaki.SndEfw):
-            raise ValueError('Invalid argument for SndEfw')
-        params = [0] * 256
-        _, params = unit.transaction(2, cmd, args, params, 100)
-        return params
+        return _execute_transaction(unit, 2, cmd, args)
 
     @classmethod
     def set_mode(cls, unit, mode):
@@ -475,11 +476,7 @@ class EftHwctl():
 
     @staticmethod
     def _execute_command(unit, cmd, args):
-        if not isinstance(unit, Hitaki.SndEfw):
-            raise ValueError('Invalid argument for SndEfw')
-        params = [0] * 256
-        _, params = unit.transaction(3, cmd, args, params, 100)
-        return params
+        return _execute_transaction(unit, 3, cmd, args)
 
     @classmethod
     def set_clock(cls, unit, rate, source, reset):
@@ -554,11 +551,7 @@ class EftPhysOutput():
 
     @staticmethod
     def _execute_command(unit, cmd, args):
-        if not isinstance(unit, Hitaki.SndEfw):
-            raise ValueError('Invalid argument for SndEfw')
-        params = [0] * 256
-        _, params = unit.transaction(4, cmd, args, params, 100)
-        return params
+        return _execute_transaction(unit, 4, cmd, args)
 
     @classmethod
     def set_param(cls, unit, operation, channel, value):
@@ -608,11 +601,7 @@ class EftPhysInput():
 
     @staticmethod
     def _execute_command(unit, cmd, args):
-        if not isinstance(unit, Hitaki.SndEfw):
-            raise ValueError('Invalid argument for SndEfw')
-        params = [0] * 256
-        _, params = unit.transaction(5, cmd, args, params, 100)
-        return params
+        return _execute_transaction(unit, 5, cmd, args)
 
     @classmethod
     def set_param(cls, unit, operation, channel, value):
@@ -650,11 +639,7 @@ class EftPlayback():
 
     @staticmethod
     def _execute_command(unit, cmd, args):
-        if not isinstance(unit, Hitaki.SndEfw):
-            raise ValueError('Invalid argument for SndEfw')
-        params = [0] * 256
-        _, params = unit.transaction(6, cmd, args, params, 100)
-        return params
+        return _execute_transaction(unit, 6, cmd, args)
 
     @classmethod
     def set_param(cls, unit, operation, channel, value):
@@ -696,11 +681,7 @@ class EftCapture():
 
     @staticmethod
     def _execute_command(unit, cmd, args):
-        if not isinstance(unit, Hitaki.SndEfw):
-            raise ValueError('Invalid argument for SndEfw')
-        params = [0] * 256
-        _, params = unit.transaction(7, cmd, args, params, 100)
-        return params
+        return _execute_transaction(unit, 7, cmd, args)
 
 #
 # Category No.8, for input monitoring multiplexer commands
@@ -712,11 +693,7 @@ class EftMonitor():
 
     @staticmethod
     def _execute_command(unit, cmd, args):
-        if not isinstance(unit, Hitaki.SndEfw):
-            raise ValueError('Invalid argument for SndEfw')
-        params = [0] * 256
-        _, params = unit.transaction(8, cmd, args, params, 100)
-        return params
+        return _execute_transaction(unit, 8, cmd, args)
 
     @classmethod
     def set_param(cls, unit, operation, in_ch, out_ch, value):
@@ -771,11 +748,7 @@ class EftIoconf():
 
     @staticmethod
     def _execute_command(unit, cmd, args):
-        if not isinstance(unit, Hitaki.SndEfw):
-            raise ValueError('Invalid argument for SndEfw')
-        params = [0] * 256
-        _, params = unit.transaction(9, cmd, args, params, 100)
-        return params
+        return _execute_transaction(unit, 9, cmd, args)
 
     @classmethod
     def set_control_room_mirroring(cls, unit, output_pair):
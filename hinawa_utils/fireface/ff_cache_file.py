@@ -0,0 +1,142 @@
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2019 Takashi Sakamoto
+
+from mmap import mmap
+from os import replace
+from struct import Struct
+
+__all__ = ['FFCacheFile']
+
+
+class FFCacheFile():
+    """
+    File layout, in little endian.
+        +--------------------+
+        | magic              |
+        | generation         |
+        | option count       |
+        | mixer count        |
+        | out count          |
+        +--------------------+
+        | option registers   |
+        | mixer registers    |
+        | out registers      |
+        +--------------------+
+    """
+    MAGIC = b'HFFC'
+
+    __HEADER = Struct('<4s4I')
+    __QUADLET = Struct('<I')
+    __BLOCKS = ('option', 'mixer', 'out')
+
+    def __init__(self, path, counts, sync=False):
+        self.__path = path
+        self.__counts = dict(zip(self.__BLOCKS, counts))
+        self.__sync = sync
+        self.__offsets = {}
+        offset = self.__HEADER.size
+        for block in self.__BLOCKS:
+            self.__offsets[block] = offset
+            offset += self.__counts[block] * 4
+        self.__size = offset
+        self.__f = None
+        self.__map = None
+        self.__interrupted = False
+
+    @classmethod
+    def is_binary(cls, path):
+        with path.open(mode='rb') as f:
+            return f.read(len(cls.MAGIC)) == cls.MAGIC
+
+    def is_interrupted(self):
+        return self.__interrupted
+
+    def load(self):
+        # Return a list of registers for each block, or None when the file
+        # is not available for the layout.
+        try:
+            f = self.__path.open(mode='r+b')
+        except OSError:
+            return None
+        try:
+            m = mmap(f.fileno(), 0)
+        except (OSError, ValueError):
+            f.close()
+            return None
+
+        if len(m) != self.__size:
+            m.close()
+            f.close()
+            return None
+
+        magic, generation, *counts = self.__HEADER.unpack_from(m)
+        if (magic != self.MAGIC or
+                tuple(counts) != tuple(self.__counts.values())):
+            m.close()
+            f.close()
+            return None
+
+        # MEMO: odd generation means that the last update was interrupted.
+        # The registers are still available, while the hardware may not
+        # have the same values.
+        self.__interrupted = bool(generation % 2)
+
+        self.__f = f
+        self.__map = m
+
+        caches = []
+        for block in self.__BLOCKS:
+            fmt = '<{0}I'.format(self.__counts[block])
+            caches.append(list(Struct(fmt).unpack_from(m,
+                                                        self.__offsets[block])))
+        return caches
+
+    def create(self, caches):
+        # Write to temporary file at first, then replace the file so that the
+        # other process never sees partial content.
+        self.close()
+        self.__interrupted = False
+        data = bytearray(self.__size)
+        self.__HEADER.pack_into(data, 0, self.MAGIC, 0,
+                                *self.__counts.values())
+        for block, cache in zip(self.__BLOCKS, caches):
+            if len(cache) != self.__counts[block]:
+                raise ValueError('Invalid argument for cache.')
+            fmt = '<{0}I'.format(len(cache))
+            Struct(fmt).pack_into(data, self.__offsets[block], *cache)
+
+        tmp = self.__path.with_name(self.__path.name + '.tmp')
+        with tmp.open(mode='wb') as f:
+            f.write(data)
+        replace(str(tmp), str(self.__path))
+
+        self.__f = self.__path.open(mode='r+b')
+        self.__map = mmap(self.__f.fileno(), 0)
+
+    def update(self, block, index, vals):
+        if self.__map is None:
+            return
+        if index < 0 or index + len(vals) > self.__counts[block]:
+            raise ValueError('Invalid argument for index of register.')
+
+        # The generation is odd while updating.
+        generation = self.__HEADER.unpack_from(self.__map)[1]
+        self.__QUADLET.pack_into(self.__map, 4, (generation + 1) & 0xffffffff)
+        offset = self.__offsets[block] + index * 4
+        Struct('<{0}I'.format(len(vals))).pack_into(self.__map, offset, *vals)
+        self.__QUADLET.pack_into(self.__map, 4, (generation + 2) & 0xffffffff)
+
+        if self.__sync:
+            self.__map.flush()
+
+    def flush(self):
+        if self.__map is not None:
+            self.__map.flush()
+
+    def close(self):
+        if self.__map is not None:
+            self.__map.close()
+            self.__map = None
+        if self.__f is not None:
+            self.__f.close()
+            self.__f = None
@@ -3,6 +3,9 @@
 
 
 class FFMixerRegs():
+    # Tables of labels and offsets, built once per specification.
+    __TABLES = {}
+
     @classmethod
     def __generate_labels(cls, spec, category):
         labels = []
@@ -10,20 +13,38 @@ class FFMixerRegs():
             labels.append('{0}-{1}'.format(category, i + 1))
         return labels
 
+    @classmethod
+    def __get_table(cls, spec):
+        key = tuple(sorted(spec.items()))
+        if key not in cls.__TABLES:
+            dsts = cls.__generate_labels(spec, 'analog')
+            dsts += cls.__generate_labels(spec, 'spdif')
+            dsts += cls.__generate_labels(spec, 'adat')
+            streams = cls.__generate_labels(spec, 'stream')
+            srcs = dsts + streams
+
+            offsets = {}
+            for i, dst in enumerate(dsts):
+                base = i * spec['avail'] * 2 * 4
+                for j, src in enumerate(dsts):
+                    offsets[(dst, src)] = base + j * 4
+                for j, src in enumerate(streams):
+                    offsets[(dst, src)] = base + (spec['avail'] + j) * 4
+
+            cls.__TABLES[key] = {
+                'dsts':     tuple(dsts),
+                'srcs':     tuple(srcs),
+                'offsets':  offsets,
+            }
+        return cls.__TABLES[key]
+
     @classmethod
     def get_mixer_labels(cls, spec: dict):
-        labels = cls.__generate_labels(spec, 'analog')
-        labels += cls.__generate_labels(spec, 'spdif')
-        labels += cls.__generate_labels(spec, 'adat')
-        return labels
+        return list(cls.__get_table(spec)['dsts'])
 
     @classmethod
     def get_mixer_src_labels(cls, spec: dict):
-        labels = cls.__generate_labels(spec, 'analog')
-        labels += cls.__generate_labels(spec, 'spdif')
-        labels += cls.__generate_labels(spec, 'adat')
-        labels += cls.__generate_labels(spec, 'stream')
-        return labels
+        return list(cls.__get_table(spec)['srcs'])
 
     @classmethod
     def calculate_src_offset(cls, spec: dict, dst: str, src: str):
@@ -46,17 +67,10 @@ class FFMixerRegs():
              =+=========+=
         """
 
-        dsts = cls.get_mixer_labels(spec)
-        srcs = cls.get_mixer_src_labels(spec)
-        if dst not in dsts:
-            raise ValueError('Invalid argument for destination of mixer.')
-        if src not in srcs:
+        table = cls.__get_table(spec)
+        offset = table['offsets'].get((dst, src))
+        if offset is None:
+            if dst not in table['dsts']:
+                raise ValueError('Invalid argument for destination of mixer.')
             raise ValueError('Invalid argument for source of mixer.')
-
-        offset = dsts.index(dst) * spec['avail'] * 2 * 4
-
-        if src.find('stream-') == 0:
-            offset += spec['avail'] * 4
-            srcs = cls.__generate_labels(spec, 'stream')
-
-        return offset + srcs.index(src) * 4
+        return offset
@@ -3,18 +3,33 @@
 
 
 class FFOutRegs():
+    # Tables of labels and offsets, built once per specification.
+    __TABLES = {}
+
+    @classmethod
+    def __get_table(cls, spec):
+        key = tuple(sorted(spec.items()))
+        if key not in cls.__TABLES:
+            labels = []
+            for i in range(spec['analog']):
+                labels.append('analog-{0}'.format(i + 1))
+            for i in range(spec['spdif']):
+                labels.append('spdif-{0}'.format(i + 1))
+            for i in range(spec['adat']):
+                labels.append('adat-{0}'.format(i + 1))
+            cls.__TABLES[key] = {
+                'labels':   tuple(labels),
+                'offsets':  {label: i * 4 for i, label in enumerate(labels)},
+            }
+        return cls.__TABLES[key]
+
     @classmethod
     def get_out_labels(cls, spec: dict):
-        labels = []
-        for i in range(spec['analog']):
-            labels.append('analog-{0}'.format(i + 1))
-        for i in range(spec['spdif']):
-            labels.append('spdif-{0}'.format(i + 1))
-        for i in range(spec['adat']):
-            labels.append('adat-{0}'.format(i + 1))
-        return labels
+        return list(cls.__get_table(spec)['labels'])
 
     @classmethod
     def calculate_out_offset(cls, spec: dict, target):
-        targets = cls.get_out_labels(spec)
-        return targets.index(target) * 4
+        offsets = cls.__get_table(spec)['offsets']
+        if target not in offsets:
+            raise ValueError('Invalid argument for output.')
+        return offsets[target]
@@ -2,6 +2,7 @@
 # Copyright (C) 2018 Takashi Sakamoto
 
 from threading import Thread
+from time import monotonic, sleep
 from math import log10
 from struct import pack, unpack
 from pathlib import Path
@@ -17,6 +18,7 @@ from hinawa_utils.fireface.ff_option_reg import FFOptionReg
 from hinawa_utils.fireface.ff_status_reg import FFStatusReg, FFClkLabels
 from hinawa_utils.fireface.ff_mixer_reg import FFMixerRegs
 from hinawa_utils.fireface.ff_out_reg import FFOutRegs
+from hinawa_utils.fireface.ff_cache_file import FFCacheFile
 
 __all__ = ['FFUnit']
 
@@ -53,7 +55,7 @@ class FFUnit(Hitaki.SndUnit):
     __MIN_VAL = 0x00000001
     __MAX_VAL = 0x00010000
 
-    def __init__(self, path):
+    def __init__(self, path, cache_sync=False):
         super().__init__()
         self.open(path, 0)
 
@@ -87,8 +89,24 @@ class FFUnit(Hitaki.SndUnit):
         guid = self.get_property('guid')
         self._path = Path('/tmp/hinawa-{0:08x}'.format(guid))
 
-        if self._path.exists() and self._path.is_file():
-            self.__read_cache_from_file()
+        # The caches are backed by binary file mapped to memory, and updated
+        # in place. The file is synchronized per update if cache_sync is set.
+        counts = (3,
+                  len(self.get_mixer_labels()) * 2 * self.__spec['avail'],
+                  len(self.get_out_labels()))
+        self.__cache_file = FFCacheFile(self._path, counts, cache_sync)
+
+        caches = self.__cache_file.load()
+        if caches is None and self.__read_cache_from_file(counts):
+            # Migrate from the former text file.
+            self.__write_cache_to_file()
+        elif caches is not None:
+            self.__option_cache, self.__mixer_cache, self.__out_cache = caches
+            if self.__cache_file.is_interrupted():
+                # Stamp the file again, then write the registers so that the
+                # hardware has the same values as the file.
+                self.__write_cache_to_file()
+                self.__load_settings()
         else:
             self.__option_cache = self.__create_option_initial_cache()
             self.__mixer_cache = self.__create_mixer_initial_cache()
@@ -99,6 +117,7 @@ class FFUnit(Hitaki.SndUnit):
         self.__load_option_settings()
 
     def release(self):
+        self.__cache_file.close()
         self.__unit_dispatcher.quit()
         self.__node_dispatcher.quit()
         self.__unit_th.join()
@@ -113,38 +132,40 @@ class FFUnit(Hitaki.SndUnit):
     def get_node(self):
         return self.__node
 
-    def __read_cache_from_file(self):
-        self.__option_cache = []
-        self.__mixer_cache = []
-        self.__out_cache = []
-        with self._path.open(mode='r') as f:
-            for i, line in enumerate(f):
-                line = line.strip()
-                tokens = line.split(' ')
-                reg_type = tokens[0]
-                reg_val = int(tokens[1], 16)
-                if reg_type == 'option':
-                    self.__option_cache.append(reg_val)
-                elif reg_type == 'mixer':
-                    self.__mixer_cache.append(reg_val)
-                elif reg_type == 'out':
-                    self.__out_cache.append(reg_val)
+    def __read_cache_from_file(self, counts):
+        # The former text file has 'option/mixer/out' hex lines.
+        if not self._path.is_file() or FFCacheFile.is_binary(self._path):
+            return False
+        caches = {
+            'option':   [],
+            'mixer':    [],
+            'out':      [],
+        }
+        try:
+            with self._path.open(mode='r') as f:
+                for i, line in enumerate(f):
+                    line = line.strip()
+                    tokens = line.split(' ')
+                    reg_type = tokens[0]
+                    reg_val = int(tokens[1], 16)
+                    if reg_type in caches:
+                        caches[reg_type].append(reg_val)
+        except (OSError, ValueError, IndexError):
+            return False
+        if tuple(len(cache) for cache in caches.values()) != counts:
+            return False
+        self.__option_cache = caches['option']
+        self.__mixer_cache = caches['mixer']
+        self.__out_cache = caches['out']
+        return True
 
     def __write_cache_to_file(self):
-        with self._path.open(mode='w+') as f:
-            for frame in self.__option_cache:
-                f.write('option {0:08x}\n'.format(frame))
-            for frame in self.__mixer_cache:
-                f.write('mixer {0:08x}\n'.format(frame))
-            for frame in self.__out_cache:
-                f.write('out {0:08x}\n'.format(frame))
+        self.__cache_file.create((self.__option_cache, self.__mixer_cache,
+                                  self.__out_cache))
 
     def __load_settings(self):
         self.__load_option_settings()
-        for target in self.get_mixer_labels():
-            for src in self.get_mixer_src_labels():
-                db = self.get_mixer_src(target, src)
-                self.set_mixer_src(target, src, db)
+        self.__write_mixer_blocks(range(len(self.get_mixer_labels())))
         for target in self.get_out_labels():
             db = self.get_out_volume(target)
             self.set_out_volume(target, db)
@@ -188,7 +209,7 @@ class FFUnit(Hitaki.SndUnit):
 
     def set_multiple_option(self, target, val):
         FFOptionReg.build_multiple_option(self.__option_cache, target, val)
-        self.__write_cache_to_file()
+        self.__cache_file.update('option', 0, self.__option_cache)
         self.__load_option_settings()
 
     def get_multiple_option(self, target):
@@ -244,23 +265,66 @@ class FFUnit(Hitaki.SndUnit):
     def set_single_option(self, target, item, enable):
         FFOptionReg.build_single_option(self.__option_cache, target, item,
                                         enable)
-        self.__write_cache_to_file()
+        self.__cache_file.update('option', 0, self.__option_cache)
         self.__load_option_settings()
 
     def get_single_option(self, target, item):
         return FFOptionReg.parse_single_option(self.__option_cache, target,
                                                item)
 
-    def get_sync_status(self):
-        req = Hinawa.FwReq.new()
-        frames = bytearray(8)
+    def __read_sync_status(self, req, frames):
         _, frames = req.transaction(self.get_node(),
                                     Hinawa.FwTcode.READ_BLOCK_REQUEST,
                                     0x0000801c0000, 8, frames, 100)
-        quads = unpack('<2I', frames)
+        return unpack('<2I', frames)
 
+    def get_sync_status(self):
+        req = Hinawa.FwReq.new()
+        quads = self.__read_sync_status(req, bytearray(8))
         return FFStatusReg.parse(quads)
 
+    def watch_sync_status(self, rate=4):
+        # Yield whole the status at first, then changed items only, polling
+        # the register per the given rate in Hz. The register is parsed only
+        # when any bit changes.
+        if rate <= 0:
+            raise ValueError('Invalid argument for rate.')
+        interval = 1 / rate
+        req = Hinawa.FwReq.new()
+        frames = bytearray(8)
+
+        prev_quads = self.__read_sync_status(req, frames)
+        prev = FFStatusReg.parse(prev_quads)
+        yield prev
+        due = monotonic()
+
+        while True:
+            due += interval
+            now = monotonic()
+            if due < now:
+                due = now
+            else:
+                sleep(due - now)
+
+            quads = self.__read_sync_status(req, frames)
+            if quads == prev_quads:
+                continue
+            prev_quads = quads
+
+            curr = FFStatusReg.parse(quads)
+            changes = {}
+            for target, val in curr.items():
+                if isinstance(val, dict):
+                    items = {name: state for name, state in val.items()
+                             if prev[target].get(name) != state}
+                    if len(items) > 0:
+                        changes[target] = items
+                elif prev.get(target) != val:
+                    changes[target] = val
+            prev = curr
+            if len(changes) > 0:
+                yield changes
+
     #
     # Configuration for internal multiplexer.
     #
@@ -304,12 +368,73 @@ class FFUnit(Hitaki.SndUnit):
                                Hinawa.FwTcode.WRITE_BLOCK_REQUEST,
                                self.__regs[1] + offset, len(data), data, 100)
         self.__mixer_cache[offset // 4] = val
-        self.__write_cache_to_file()
+        self.__cache_file.update('mixer', offset // 4, (val, ))
 
     def get_mixer_src(self, target, src):
         offset = FFMixerRegs.calculate_src_offset(self.__spec, target, src)
         return self.__parse_val_to_db(self.__mixer_cache[offset // 4])
 
+    def __write_mixer_block(self, req, index, vals):
+        # Registers for inputs and streams of a destination are contiguous,
+        # thus written by one transaction.
+        pos = index * self.__spec['avail'] * 2
+        data = pack('<{0}I'.format(len(vals)), *vals)
+        _, _ = req.transaction(self.get_node(),
+                               Hinawa.FwTcode.WRITE_BLOCK_REQUEST,
+                               self.__regs[1] + pos * 4, len(data), data, 100)
+
+    def __write_mixer_blocks(self, indices):
+        count = self.__spec['avail'] * 2
+        req = Hinawa.FwReq.new()
+        for index in indices:
+            pos = index * count
+            self.__write_mixer_block(req, index,
+                                     self.__mixer_cache[pos:pos + count])
+
+    def __get_mixer_src_positions(self):
+        # Position of register for each source in block of destination.
+        target = self.get_mixer_labels()[0]
+        return [FFMixerRegs.calculate_src_offset(self.__spec, target, src) // 4
+                for src in self.get_mixer_src_labels()]
+
+    def get_mixer_matrix(self):
+        # A list of gains in dB from sources for each destination.
+        count = self.__spec['avail'] * 2
+        positions = self.__get_mixer_src_positions()
+        matrix = []
+        for i in range(len(self.get_mixer_labels())):
+            block = self.__mixer_cache[i * count:(i + 1) * count]
+            matrix.append([self.__parse_val_to_db(block[pos])
+                           for pos in positions])
+        return matrix
+
+    def set_mixer_matrix(self, matrix):
+        targets = self.get_mixer_labels()
+        positions = self.__get_mixer_src_positions()
+        if (len(matrix) != len(targets) or
+                any(len(row) != len(positions) for row in matrix)):
+            raise ValueError('Invalid argument for shape of matrix.')
+
+        # Destinations with any change are written by one transaction for
+        # each.
+        count = self.__spec['avail'] * 2
+        req = Hinawa.FwReq.new()
+        for i, row in enumerate(matrix):
+            pos = i * count
+            block = self.__mixer_cache[pos:pos + count]
+            for j, db in enumerate(row):
+                # MEMO: the conversion from dB truncates, thus the value given
+                # by get_mixer_matrix() is not converted to the same register.
+                # Compare it in dB so that untouched cells are kept.
+                if db == self.__parse_val_to_db(block[positions[j]]):
+                    continue
+                block[positions[j]] = self.__build_val_from_db(db)
+            if block == self.__mixer_cache[pos:pos + count]:
+                continue
+            self.__write_mixer_block(req, i, block)
+            self.__mixer_cache[pos:pos + count] = block
+            self.__cache_file.update('mixer', pos, block)
+
     #
     # Configuration for output.
     #
@@ -335,6 +460,7 @@ class FFUnit(Hitaki.SndUnit):
                                Hinawa.FwTcode.WRITE_BLOCK_REQUEST,
                                self.__regs[2] + offset, len(data), data, 100)
         self.__out_cache[offset // 4] = val
+        self.__cache_file.update('out', offset // 4, (val, ))
 
     def get_out_volume(self, target):
         offset = FFOutRegs.calculate_out_offset(self.__spec, target)
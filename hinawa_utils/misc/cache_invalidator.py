@@ -0,0 +1,101 @@
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2019 Takashi Sakamoto
+
+from threading import Lock
+
+__all__ = ['CacheInvalidator']
+
+
+class CacheInvalidator():
+    EVENTS = (
+        'bus-update',       # Hinawa.FwNode
+        'disconnected',     # Hinawa.FwNode and Hitaki.AlsaFirewire
+        'lock-status',      # Hitaki.AlsaFirewire
+        'notified',         # Hitaki.SndDice and Hitaki.SndMotu
+    )
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__entries = {}
+
+    def attach_node(self, node):
+        node.connect('bus-update', lambda node: self.__handle('bus-update'))
+        node.connect('disconnected',
+                     lambda node: self.__handle('disconnected'))
+
+    def attach_unit(self, unit, worker=None):
+        unit.connect('lock-status',
+                     lambda unit, locked: self.__handle('lock-status'))
+        # Notifications are handled in the worker when given, so that the
+        # burst of them invalidates caches just before reloading them.
+        if worker is not None:
+            worker.register(0xffffffff,
+                            lambda msg: self.__handle('notified', msg))
+            return
+        try:
+            unit.connect('notified',
+                         lambda unit, msg: self.__handle('notified', msg))
+        except TypeError:
+            # The unit has no signal for notification.
+            pass
+
+    def register(self, name, loader, events, notify_mask=0xffffffff):
+        for event in events:
+            if event not in self.EVENTS:
+                raise ValueError('Invalid argument for event.')
+        with self.__lock:
+            self.__entries[name] = {
+                'loader':       loader,
+                'events':       tuple(events),
+                'notify-mask':  notify_mask,
+                'generation':   0,
+                'valid':        False,
+                'value':        None,
+            }
+
+    def get(self, name):
+        with self.__lock:
+            if name not in self.__entries:
+                raise ValueError('Invalid argument for name of cache.')
+            entry = self.__entries[name]
+            if entry['valid']:
+                return entry['value']
+            generation = entry['generation']
+
+        # MEMO: the loader is called without holding the lock since it usually
+        # waits for transactions which are dispatched in the other thread.
+        value = entry['loader']()
+
+        with self.__lock:
+            # Keep it invalid when any event arrived during loading.
+            if entry['generation'] == generation:
+                entry['value'] = value
+                entry['valid'] = True
+        return value
+
+    def update(self, name, value):
+        with self.__lock:
+            if name not in self.__entries:
+                raise ValueError('Invalid argument for name of cache.')
+            entry = self.__entries[name]
+            entry['generation'] += 1
+            entry['value'] = value
+            entry['valid'] = True
+
+    def invalidate(self, name):
+        with self.__lock:
+            if name not in self.__entries:
+                raise ValueError('Invalid argument for name of cache.')
+            entry = self.__entries[name]
+            entry['generation'] += 1
+            entry['valid'] = False
+
+    def __handle(self, event, msg=0):
+        with self.__lock:
+            for entry in self.__entries.values():
+                if event not in entry['events']:
+                    continue
+                if event == 'notified' and not msg & entry['notify-mask']:
+                    continue
+                entry['generation'] += 1
+                entry['valid'] = False
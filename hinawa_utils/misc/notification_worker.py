@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2019 Takashi Sakamoto
+
+from threading import Thread, Condition
+from time import monotonic
+
+__all__ = ['NotificationWorker']
+
+
+class NotificationWorker():
+    # Bits of notifications are coalesced in a single worker thread. Handlers
+    # are called with the coalesced bits once the burst of notifications
+    # settles down for the debounce period in second, or the first of them
+    # is deferred for the maximum delay.
+    def __init__(self, debounce=0.05, max_delay=0.5):
+        self.__debounce = debounce
+        self.__max_delay = max_delay
+        self.__handlers = []
+        self.__pending = 0
+        self.__first = 0.0
+        self.__serial = 0
+        self.__running = True
+        self.__cond = Condition()
+        self.__th = Thread(target=self.__run)
+        self.__th.start()
+
+    def register(self, mask, handler):
+        with self.__cond:
+            self.__handlers.append((mask, handler))
+
+    def post(self, msg):
+        with self.__cond:
+            if not self.__pending:
+                self.__first = monotonic()
+            self.__pending |= msg
+            self.__serial += 1
+            self.__cond.notify_all()
+
+    def stop(self):
+        with self.__cond:
+            self.__running = False
+            self.__cond.notify_all()
+        self.__th.join()
+
+    def __run(self):
+        while True:
+            with self.__cond:
+                while self.__running and not self.__pending:
+                    self.__cond.wait()
+                # Wait till no notification arrives within the period. The
+                # continuous stream of notifications doesn't starve handlers.
+                deadline = self.__first + self.__max_delay
+                while self.__running:
+                    remain = deadline - monotonic()
+                    if remain <= 0:
+                        break
+                    serial = self.__serial
+                    self.__cond.wait(min(self.__debounce, remain))
+                    if self.__serial == serial:
+                        break
+                if not self.__running:
+                    return
+                msg = self.__pending
+                self.__pending = 0
+                handlers = [handler for mask, handler in self.__handlers
+                            if mask & msg]
+
+            for handler in handlers:
+                try:
+                    handler(msg)
+                except Exception:
+                    # MEMO: the error is raised again at next access by the
+                    # caller.
+                    pass
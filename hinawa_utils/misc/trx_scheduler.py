@@ -0,0 +1,97 @@
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2019 Takashi Sakamoto
+
+from threading import Condition, local
+from contextlib import contextmanager
+from heapq import heappush, heappop, heapify
+from itertools import count
+from time import monotonic
+
+__all__ = ['TrxScheduler']
+
+
+class TrxScheduler():
+    # Lower index wins when several threads wait for the unit.
+    CATEGORIES = (
+        'control',
+        'refresh',
+        'metering',
+    )
+
+    def __init__(self, slots=1):
+        if slots < 1:
+            raise ValueError('Invalid argument for slots.')
+        self.__slots = slots
+        self.__running = 0
+        self.__waiters = []
+        self.__seq = count()
+        self.__cond = Condition()
+        self.__local = local()
+
+    @contextmanager
+    def classify(self, category, deadline=None):
+        # Transactions issued by the calling thread within the scope are
+        # arbitrated as the category. When deadline in second is given, any
+        # transaction still waiting for the unit after it expires is dropped.
+        if category not in self.CATEGORIES:
+            raise ValueError('Invalid argument for category.')
+        if deadline is not None:
+            deadline += monotonic()
+
+        prev = getattr(self.__local, 'scope', None)
+        self.__local.scope = (category, deadline)
+        try:
+            yield
+        finally:
+            self.__local.scope = prev
+
+    def inherit(self, func):
+        # Return a callable to run the function within the scope of calling
+        # thread, for the case to delegate transactions to the other thread.
+        scope = getattr(self.__local, 'scope', None)
+
+        def run(*args):
+            prev = getattr(self.__local, 'scope', None)
+            self.__local.scope = scope
+            try:
+                return func(*args)
+            finally:
+                self.__local.scope = prev
+        return run
+
+    def execute(self, func, *args):
+        scope = getattr(self.__local, 'scope', None)
+        if scope is None:
+            scope = (self.CATEGORIES[0], None)
+        category, deadline = scope
+
+        entry = (self.CATEGORIES.index(category), next(self.__seq))
+
+        with self.__cond:
+            heappush(self.__waiters, entry)
+            while (self.__running >= self.__slots or
+                   self.__waiters[0] != entry):
+                if deadline is None:
+                    self.__cond.wait()
+                    continue
+                remain = deadline - monotonic()
+                if remain <= 0 or not self.__cond.wait(remain):
+                    if (self.__running < self.__slots and
+                            self.__waiters[0] == entry):
+                        break
+                    self.__waiters.remove(entry)
+                    heapify(self.__waiters)
+                    self.__cond.notify_all()
+                    raise TimeoutError('Stale {0} request is dropped.'.format(
+                        category))
+            heappop(self.__waiters)
+            self.__running += 1
+            # The next waiter can take a spare slot.
+            self.__cond.notify_all()
+
+        try:
+            return func(*args)
+        finally:
+            with self.__cond:
+                self.__running -= 1
+                self.__cond.notify_all()
@@ -11,7 +11,10 @@ gi.require_version('Hinawa', '4.0')
 gi.require_version('Hitaki', '0.0')
 from gi.repository import GLib, Hinawa, Hitaki
 
+from hinawa_utils.misc.cache_invalidator import CacheInvalidator
+
 from hinawa_utils.ta1394.config_rom_parser import Ta1394ConfigRomParser
+from hinawa_utils.ta1394.fcp_engine import FcpEngine
 from hinawa_utils.ta1394.general import AvcConnection
 from hinawa_utils.ta1394.streamformat import AvcStreamFormatInfo
 
@@ -19,6 +22,10 @@ __all__ = ['OxfwUnit']
 
 
 class OxfwUnit(Hitaki.SndUnit):
+    # The number of AV/C commands outstanding at once. Models which tolerate
+    # pipelined commands can override it.
+    FCP_MAX_OUTSTANDING = 1
+
     def __init__(self, path):
         super().__init__()
         self.open(path, 0)
@@ -50,12 +57,24 @@ class OxfwUnit(Hitaki.SndUnit):
 
         self.fcp = Hinawa.FwFcp()
         _ = self.fcp.bind(self.get_node())
+        self.fcp_engine = FcpEngine(self.fcp, self.FCP_MAX_OUTSTANDING)
+
+        # Cached state of the unit is invalidated by events.
+        self.__invalidator = CacheInvalidator()
+        self.__invalidator.attach_node(self.__node)
+        self.__invalidator.attach_unit(self)
 
         self.hw_info = self._parse_hardware_info()
         self.supported_sampling_rates = self._parse_supported_sampling_rates()
-        self.supported_stream_formats = self._parse_supported_stream_formats()
+
+        # The stream formats can be changed by firmware update.
+        self.__invalidator.register('stream-formats',
+                                    self._parse_supported_stream_formats,
+                                    ('bus-update', 'disconnected'))
+        self.__invalidator.get('stream-formats')
 
     def release(self):
+        self.fcp_engine.release()
         self.fcp.unbind()
         self.__unit_dispatcher.quit()
         self.__node_dispatcher.quit()
@@ -71,6 +90,13 @@ class OxfwUnit(Hitaki.SndUnit):
     def get_node(self):
         return self.__node
 
+    def get_invalidator(self):
+        return self.__invalidator
+
+    @property
+    def supported_stream_formats(self):
+        return self.__invalidator.get('stream-formats')
+
     def _parse_hardware_info(self):
         hw_info = {}
 
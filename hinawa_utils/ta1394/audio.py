@@ -23,46 +23,32 @@ class AvcAudio():
         'delta':        0x19,
     }
 
+    _SELECTOR_ATTRS = ('current', 'minimum', 'maximum', 'default')
+    _MIXER_ATTRS = ('current', 'minimum', 'maximum', 'resolution', 'default')
     @classmethod
     def set_selector_state(cls, fcp, subunit_id, attr, fb_id, value):
         if subunit_id > 0x07:
             raise ValueError('Invalid argument for subunit ID')
-        if attr not in ('current', 'minimum', 'maximum', 'default'):
+        if attr not in cls._SELECTOR_ATTRS:
             raise ValueError('Invalid argument for attribute')
         if fb_id > 255:
             raise ValueError('Invalid argument for function block ID')
         if value > 255:
             raise ValueError('Invalid argument for selector value')
-        args = bytearray()
-        args.append(0x00)
-        args.append(0x08 | (subunit_id & 0x07))
-        args.append(0xb8)
-        args.append(0x80)   # Selector function block
-        args.append(fb_id)
-        args.append(cls.ATTRIBUTE_VALUES[attr])
-        args.append(0x02)   # Selector length is 2
-        args.append(value)
-        args.append(0x01)   # Selector control
+        args = bytearray((0x00, 0x08 | (subunit_id & 0x07), 0xb8, 0x80, fb_id,
+                          cls.ATTRIBUTE_VALUES[attr], 0x02, value, 0x01))
         AvcGeneral.command_control(fcp, args)
 
     @classmethod
     def get_selector_state(cls, fcp, subunit_id, attr, fb_id):
         if subunit_id > 0x07:
             raise ValueError('Invalid argument for subunit ID')
-        if attr not in ('current', 'minimum', 'maximum', 'default'):
+        if attr not in cls._SELECTOR_ATTRS:
             raise ValueError('Invalid argument for attribute')
         if fb_id > 255:
             raise ValueError('Invalid argument for function block ID')
-        args = bytearray()
-        args.append(0x01)
-        args.append(0x08 | (subunit_id & 0x07))
-        args.append(0xb8)
-        args.append(0x80)   # Selector function block
-        args.append(fb_id)
-        args.append(cls.ATTRIBUTE_VALUES[attr])
-        args.append(0x02)   # Selector length is 2
-        args.append(0xff)
-        args.append(0x01)   # Selector control
+        args = bytearray((0x01, 0x08 | (subunit_id & 0x07), 0xb8, 0x80, fb_id,
+                          cls.ATTRIBUTE_VALUES[attr], 0x02, 0xff, 0x01))
         params = AvcGeneral.command_status(fcp, args)
         return params[7]
 
@@ -80,18 +66,9 @@ class AvcAudio():
             val = 0x70
         else:
             val = 0x60
-        args = bytearray()
-        args.append(0x00)
-        args.append(0x08 | (subunit_id & 0x07))
-        args.append(0xb8)
-        args.append(0x81)   # Feature function block
-        args.append(fb_id)
-        args.append(cls.ATTRIBUTE_VALUES[attr])
-        args.append(0x02)   # Selector length is 2
-        args.append(ch)
-        args.append(0x01)   # Mute control
-        args.append(0x01)   # Control data length is 1
-        args.append(val)
+        args = bytearray((0x00, 0x08 | (subunit_id & 0x07), 0xb8, 0x81, fb_id,
+                          cls.ATTRIBUTE_VALUES[attr], 0x02, ch, 0x01, 0x01,
+                          val))
         AvcGeneral.command_control(fcp, args)
 
     @classmethod
@@ -104,18 +81,9 @@ class AvcAudio():
             raise ValueError('Invalid argument for function block ID')
         if ch > 255:
             raise ValueError('Invalid argument for channel number')
-        args = bytearray()
-        args.append(0x01)
-        args.append(0x08 | (subunit_id & 0x07))
-        args.append(0xb8)
-        args.append(0x81)   # Feature function block
-        args.append(fb_id)
-        args.append(cls.ATTRIBUTE_VALUES[attr])
-        args.append(0x02)   # Selector length is 2
-        args.append(ch)
-        args.append(0x01)   # Mute control
-        args.append(0x01)   # Control data length is 1
-        args.append(0xff)   # Status
+        args = bytearray((0x01, 0x08 | (subunit_id & 0x07), 0xb8, 0x81, fb_id,
+                          cls.ATTRIBUTE_VALUES[attr], 0x02, ch, 0x01, 0x01,
+                          0xff))
         params = AvcGeneral.command_status(fcp, args)
         val = params[10]
         if val == 0x70:
@@ -129,7 +97,7 @@ class AvcAudio():
     def set_feature_volume_state(cls, fcp, subunit_id, attr, fb_id, ch, data):
         if subunit_id > 0x07:
             raise ValueError('Invalid argument for subunit ID')
-        if attr not in cls.ATTRIBUTES:
+        if attr not in cls.ATTRIBUTE_VALUES:
             raise ValueError('Invalid argument for attribute')
         if fb_id > 255:
             raise ValueError('Invalid argument for function block ID')
@@ -137,43 +105,24 @@ class AvcAudio():
             raise ValueError('Invalid argument for channel number')
         if len(data) != 2:
             raise ValueError('Invalid argument for data array')
-        args = bytearray()
-        args.append(0x00)
-        args.append(0x08 | (subunit_id & 0x07))
-        args.append(0xb8)
-        args.append(0x81)   # Feature function block
-        args.append(fb_id)
-        args.append(cls.ATTRIBUTE_VALUES[attr])
-        args.append(0x02)   # Selector length is 2
-        args.append(ch)
-        args.append(0x02)   # Volume control
-        args.append(0x02)   # Control data length is 2
-        args.extend(data)   # Higher and lower parts of volume
+        args = bytearray((0x00, 0x08 | (subunit_id & 0x07), 0xb8, 0x81, fb_id,
+                          cls.ATTRIBUTE_VALUES[attr], 0x02, ch, 0x02, 0x02,
+                          data[0], data[1]))
         AvcGeneral.command_control(fcp, args)
 
     @classmethod
     def get_feature_volume_state(cls, fcp, subunit_id, attr, fb_id, ch):
         if subunit_id > 0x07:
             raise ValueError('Invalid argument for subunit ID')
-        if attr not in cls.ATTRIBUTES:
+        if attr not in cls.ATTRIBUTE_VALUES:
             raise ValueError('Invalid argument for attribute')
         if fb_id > 255:
             raise ValueError('Invalid argument for function block ID')
         if ch > 255:
             raise ValueError('Invalid argument for channel number')
-        args = bytearray()
-        args.append(0x01)
-        args.append(0x08 | (subunit_id & 0x07))
-        args.append(0xb8)
-        args.append(0x81)   # Feature function block
-        args.append(fb_id)
-        args.append(cls.ATTRIBUTE_VALUES[attr])
-        args.append(0x02)   # Selector length is 2
-        args.append(ch)
-        args.append(0x02)   # Volume control
-        args.append(0x02)   # Control data length is 2
-        args.append(0xff)   # Higher part of volume
-        args.append(0xff)   # Lower part of volume
+        args = bytearray((0x01, 0x08 | (subunit_id & 0x07), 0xb8, 0x81, fb_id,
+                          cls.ATTRIBUTE_VALUES[attr], 0x02, ch, 0x02, 0x02,
+                          0xff, 0xff))
         params = AvcGeneral.command_status(fcp, args)
         data = params[10:12]
         return data
@@ -182,7 +131,7 @@ class AvcAudio():
     def set_feature_lr_state(cls, fcp, subunit_id, attr, fb_id, ch, data):
         if subunit_id > 0x07:
             raise ValueError('Invalid argument for subunit ID')
-        if attr not in cls.ATTRIBUTES:
+        if attr not in cls.ATTRIBUTE_VALUES:
             raise ValueError('Invalid argument for attribute')
         if fb_id > 255:
             raise ValueError('Invalid argument for function block ID')
@@ -190,43 +139,24 @@ class AvcAudio():
             raise ValueError('Invalid argument for channel number')
         if len(data) != 2:
             raise ValueError('Invalid argument for data array')
-        args = bytearray()
-        args.append(0x00)
-        args.append(0x08 | (subunit_id & 0x07))
-        args.append(0xb8)
-        args.append(0x81)   # Feature function block
-        args.append(fb_id)
-        args.append(cls.ATTRIBUTE_VALUES[attr])
-        args.append(0x02)   # Selector length is 2
-        args.append(ch)
-        args.append(0x03)   # LR control
-        args.append(0x02)   # Control data length is 2
-        args.extend(data)   # Higher and lower parts of volume
+        args = bytearray((0x00, 0x08 | (subunit_id & 0x07), 0xb8, 0x81, fb_id,
+                          cls.ATTRIBUTE_VALUES[attr], 0x02, ch, 0x03, 0x02,
+                          data[0], data[1]))
         AvcGeneral.command_control(fcp, args)
 
     @classmethod
     def get_feature_lr_state(cls, fcp, subunit_id, attr, fb_id, ch):
         if subunit_id > 0x07:
             raise ValueError('Invalid argument for subunit ID')
-        if attr not in cls.ATTRIBUTES:
+        if attr not in cls.ATTRIBUTE_VALUES:
             raise ValueError('Invalid argument for attribute')
         if fb_id > 255:
             raise ValueError('Invalid argument for function block ID')
         if ch > 255:
             raise ValueError('Invalid argument for channel number')
-        args = bytearray()
-        args.append(0x01)
-        args.append(0x08 | (subunit_id & 0x07))
-        args.append(0xb8)
-        args.append(0x81)   # Feature function block
-        args.append(fb_id)
-        args.append(cls.ATTRIBUTE_VALUES[attr])
-        args.append(0x02)   # Selector length is 2
-        args.append(ch)
-        args.append(0x03)   # LR control
-        args.append(0x02)   # Control data length is 2
-        args.append(0xff)   # Higher part of balance
-        args.append(0xff)   # Lower part of balance
+        args = bytearray((0x01, 0x08 | (subunit_id & 0x07), 0xb8, 0x81, fb_id,
+                          cls.ATTRIBUTE_VALUES[attr], 0x02, ch, 0x03, 0x02,
+                          0xff, 0xff))
         params = AvcGeneral.command_status(fcp, args)
         data = params[10:12]
         return data
@@ -234,10 +164,9 @@ class AvcAudio():
     @classmethod
     def set_processing_mixer_state(cls, fcp, subunit_id, attr, fb_id, in_fb,
                                    in_ch, out_ch, data):
-        attrs = ('current', 'minimum', 'maximum', 'resolution', 'default')
         if subunit_id > 0x07:
             raise ValueError('Invalid argument for subunit ID')
-        if attr not in attrs:
+        if attr not in cls._MIXER_ATTRS:
             raise ValueError('Invalid argument for attribute')
         if fb_id > 255:
             raise ValueError('Invalid argument for function block ID')
@@ -249,29 +178,17 @@ class AvcAudio():
             raise ValueError('Invalid argument for output channel number')
         if len(data) != 2:
             raise ValueError('Invalid argument for data array')
-        args = bytearray()
-        args.append(0x00)
-        args.append(0x08 | (subunit_id & 0x07))
-        args.append(0xb8)
-        args.append(0x82)   # Processing function block
-        args.append(fb_id)
-        args.append(cls.ATTRIBUTE_VALUES[attr])
-        args.append(0x04)   # Selector length is 4
-        args.append(in_fb)
-        args.append(in_ch)
-        args.append(out_ch)
-        args.append(0x03)   # Mixer control
-        args.append(0x02)   # Control data is 2
-        args.extend(data)   # Higher and lower parts of setting
+        args = bytearray((0x00, 0x08 | (subunit_id & 0x07), 0xb8, 0x82, fb_id,
+                          cls.ATTRIBUTE_VALUES[attr], 0x04, in_fb, in_ch,
+                          out_ch, 0x03, 0x02, data[0], data[1]))
         AvcGeneral.command_control(fcp, args)
 
     @classmethod
     def get_processing_mixer_state(cls, fcp, subunit_id, attr, fb_id, in_fb,
                                    in_ch, out_ch):
-        attrs = ('current', 'minimum', 'maximum', 'resolution', 'default')
         if subunit_id > 0x07:
             raise ValueError('Invalid argument for subunit ID')
-        if attr not in attrs:
+        if attr not in cls._MIXER_ATTRS:
             raise ValueError('Invalid argument for attribute')
         if fb_id > 255:
             raise ValueError('Invalid argument for function block ID')
@@ -281,21 +198,9 @@ class AvcAudio():
             raise ValueError('Invalid argument for input channel number')
         if out_ch > 255:
             raise ValueError('Invalid argument for output channel number')
-        args = bytearray()
-        args.append(0x01)
-        args.append(0x08 | (subunit_id & 0x07))
-        args.append(0xb8)
-        args.append(0x82)   # Processing function block
-        args.append(fb_id)
-        args.append(cls.ATTRIBUTE_VALUES[attr])
-        args.append(0x04)   # Selector length is 4
-        args.append(in_fb)
-        args.append(in_ch)
-        args.append(out_ch)
-        args.append(0x03)   # Mixer control
-        args.append(0x02)   # Control data is 2
-        args.append(0xff)   # Higher part of setting
-        args.append(0xff)   # Lower part of setting
+        args = bytearray((0x01, 0x08 | (subunit_id & 0x07), 0xb8, 0x82, fb_id,
+                          cls.ATTRIBUTE_VALUES[attr], 0x04, in_fb, in_ch,
+                          out_ch, 0x03, 0x02, 0xff, 0xff))
         params = AvcGeneral.command_status(fcp, args)
         data = params[12:14]
         return data
@@ -303,10 +208,9 @@ class AvcAudio():
     @classmethod
     def set_processing_mixer_state_all(cls, fcp, subunit_id, attr, fb_id, in_fb,
                                        data):
-        attrs = ('current', 'minimum', 'maximum', 'resolution', 'default')
         if subunit_id > 0x07:
             raise ValueError('Invalid argument for subunit ID')
-        if attr not in attrs:
+        if attr not in cls._MIXER_ATTRS:
             raise ValueError('Invalid argument for attribute')
         if fb_id > 255:
             raise ValueError('Invalid argument for function block ID')
@@ -315,19 +219,9 @@ class AvcAudio():
         for datum in data:
             if len(data) != 2:
                 raise ValueError('Invalid argument for array of data array')
-        args = bytearray()
-        args.append(0x00)
-        args.append(0x08 | (subunit_id & 0x07))
-        args.append(0xb8)
-        args.append(0x82)   # Processing function block
-        args.append(fb_id)
-        args.append(cls.ATTRIBUTE_VALUES[attr])
-        args.append(0x04)   # Selector length is 4
-        args.append(in_fb)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0x03)       # Mixer control
-        args.append(len(data))  # The length of control data
+        args = bytearray((0x00, 0x08 | (subunit_id & 0x07), 0xb8, 0x82, fb_id,
+                          cls.ATTRIBUTE_VALUES[attr], 0x04, in_fb, 0xff, 0xff,
+                          0x03, len(data)))
         for datum in data:
             args.extend(datum)
         AvcGeneral.command_control(fcp, args)
@@ -335,28 +229,17 @@ class AvcAudio():
     @classmethod
     def get_processing_mixer_state_all(cls, fcp, subunit_id, attr,
                                        fb_id, in_fb):
-        attrs = ('current', 'minimum', 'maximum', 'resolution', 'default')
         if subunit_id > 0x07:
             raise ValueError('Invalid argument for subunit ID')
-        if attr not in attrs:
+        if attr not in cls._MIXER_ATTRS:
             raise ValueError('Invalid argument for attribute')
         if fb_id > 255:
             raise ValueError('Invalid argument for function block ID')
         if in_fb > 255:
             raise ValueError('Invalid argument for input function block ID')
-        args = bytearray()
-        args.append(0x01)
-        args.append(0x08 | (subunit_id & 0x07))
-        args.append(0xb8)
-        args.append(0x82)   # Processing function block
-        args.append(fb_id)
-        args.append(cls.ATTRIBUTE_VALUES[attr])
-        args.append(0x04)   # Selector length is 4
-        args.append(in_fb)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0x03)   # Mixer control
-        args.append(0xff)   # The length of control data in response
+        args = bytearray((0x01, 0x08 | (subunit_id & 0x07), 0xb8, 0x82, fb_id,
+                          cls.ATTRIBUTE_VALUES[attr], 0x04, in_fb, 0xff, 0xff,
+                          0x03, 0xff))
         params = AvcGeneral.command_status(fcp, args)
         count = params[11] // 2
         data = []
@@ -26,12 +26,12 @@ class AvcCcm():
 
     @classmethod
     def get_subunit_signal_addr(cls, type, id, plug):
-        if type not in AvcGeneral.SUBUNIT_TYPES:
+        if type not in AvcGeneral._SUBUNIT_TYPE_CODES:
             raise ValueError('Invalid argument for subunit type')
         if plug >= 30:
             raise ValueError('Invalid argument for plug number')
         addr = bytearray()
-        addr.append((AvcGeneral.SUBUNIT_TYPES.index(type) << 3) | id)
+        addr.append((AvcGeneral._SUBUNIT_TYPE_CODES[type] << 3) | id)
         addr.append(plug)
         return addr
 
@@ -70,41 +70,19 @@ class AvcCcm():
 
     @classmethod
     def set_signal_source(cls, fcp, src, dst):
-        args = bytearray()
-        args.append(0x00)
-        args.append(0xff)
-        args.append(0x1a)
-        args.append(0x0f)
-        args.append(src[0])
-        args.append(src[1])
-        args.append(dst[0])
-        args.append(dst[1])
+        args = bytearray((0x00, 0xff, 0x1a, 0x0f, src[0], src[1], dst[0],
+                          dst[1]))
         return AvcGeneral.command_control(fcp, args)
 
     @classmethod
     def get_signal_source(cls, fcp, dst):
-        args = bytearray()
-        args.append(0x01)
-        args.append(0xff)
-        args.append(0x1a)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xfe)
-        args.append(dst[0])
-        args.append(dst[1])
+        args = bytearray((0x01, 0xff, 0x1a, 0xff, 0xff, 0xfe, dst[0], dst[1]))
         params = AvcGeneral.command_status(fcp, args)
         src = params[4:6]
         return cls.parse_signal_addr(src)
 
     @classmethod
     def ask_signal_source(cls, fcp, src, dst):
-        args = bytearray()
-        args.append(0x02)
-        args.append(0xff)
-        args.append(0x1a)
-        args.append(0xff)
-        args.append(src[0])
-        args.append(src[1])
-        args.append(dst[0])
-        args.append(dst[1])
+        args = bytearray((0x02, 0xff, 0x1a, 0xff, src[0], src[1], dst[0],
+                          dst[1]))
         AvcGeneral.command_inquire(fcp, args)
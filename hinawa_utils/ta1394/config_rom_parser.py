@@ -15,7 +15,9 @@ class Ta1394ConfigRomParser(Ieee1394ConfigRomParser):
 
     def parse_rom(self, data):
         entries = super().parse_rom(data)
-        return self.__parse_entries(entries['root-directory'])
+        info = self.__parse_entries(entries['root-directory'])
+        info['bus-info'] = entries['bus-info']
+        return info
 
     def __parse_entries(self, entries):
         # Recommended layout.
@@ -0,0 +1,152 @@
+# SPDX-License-Identifier: LGPL-3.0-or-later
+# Copyright (C) 2019 Takashi Sakamoto
+
+from threading import Condition
+from time import monotonic
+
+import gi
+gi.require_version('Hinawa', '4.0')
+from gi.repository import Hinawa
+
+from hinawa_utils.ta1394.general import AvcGeneral
+
+__all__ = ['FcpEngine']
+
+
+class FcpEngine():
+    # MEMO: AV/C response frame has no field to identify the command, thus the
+    # response is matched to the command by the bytes following to command
+    # code; subunit address, opcode and any operands echoed by the target. Two
+    # commands with the same bytes are never outstanding at the same time.
+    MATCH_LENGTH = 3
+
+    # The target can defer final response after INTERIM response as long as
+    # it likes, while the deadline is expanded.
+    INTERIM_TIMEOUT = 10000
+
+    def __init__(self, fcp, max_outstanding=1, timeout=100):
+        if not isinstance(fcp, Hinawa.FwFcp):
+            raise ValueError('Invalid argument for FwFcp')
+        if max_outstanding < 1:
+            raise ValueError('Invalid argument for maximum outstanding')
+        self.__fcp = fcp
+        self.__max_outstanding = max_outstanding
+        self.__timeout = timeout
+        self.__cond = Condition()
+        self.__pending = {}
+        # The engine is the only owner of transport for the FwFcp.
+        AvcGeneral.attach_engine(fcp, self)
+        self.__handler = fcp.connect('responded', self.__handle_responded)
+
+    def release(self):
+        self.__fcp.disconnect(self.__handler)
+        AvcGeneral.detach_engine(self.__fcp)
+        with self.__cond:
+            for ticket in self.__pending.values():
+                ticket['error'] = OSError('FCP engine is released')
+            self.__pending.clear()
+            self.__cond.notify_all()
+
+    def submit(self, cmd, match=MATCH_LENGTH):
+        if cmd[0] not in AvcGeneral.RESPONSE_CODES:
+            raise ValueError('Invalid command code')
+        if match < self.MATCH_LENGTH or match > len(cmd):
+            raise ValueError('Invalid argument for length to match')
+        ticket = {
+            'cmd':      bytes(cmd),
+            'key':      bytes(cmd[1:match]),
+            'deadline': 0,
+            'frame':    None,
+            'error':    None,
+        }
+
+        with self.__cond:
+            while (len(self.__pending) >= self.__max_outstanding or
+                   self.__find_pending(ticket['key']) is not None):
+                self.__expire()
+                self.__cond.wait(self.__timeout / 1000)
+            ticket['deadline'] = monotonic() + self.__timeout / 1000
+            self.__pending[id(ticket)] = ticket
+
+        # MEMO: the response can arrive before returning from the call.
+        try:
+            self.__fcp.command(ticket['cmd'], self.__timeout)
+        except Exception:
+            with self.__cond:
+                self.__pending.pop(id(ticket), None)
+                self.__cond.notify_all()
+            raise
+
+        return ticket
+
+    def collect(self, ticket):
+        with self.__cond:
+            while ticket['frame'] is None and ticket['error'] is None:
+                self.__expire()
+                remain = ticket['deadline'] - monotonic()
+                if remain > 0:
+                    self.__cond.wait(remain)
+        if ticket['error'] is not None:
+            raise ticket['error']
+        return AvcGeneral.check_response(ticket['cmd'], ticket['frame'])
+
+    def transaction(self, cmd, match=MATCH_LENGTH):
+        return self.collect(self.submit(cmd, match))
+
+    def transact_batch(self, cmds, match=MATCH_LENGTH):
+        # Commands are submitted as long as the flow control allows, then the
+        # result of each is collected in the order. The result is either
+        # response frame or exception. The length to match is given by integer
+        # or the list for each command.
+        if isinstance(match, int):
+            matches = [match] * len(cmds)
+        else:
+            matches = match
+        tickets = []
+        for cmd, length in zip(cmds, matches):
+            try:
+                tickets.append(self.submit(cmd, length))
+            except Exception as e:
+                tickets.append(e)
+
+        results = []
+        for ticket in tickets:
+            if isinstance(ticket, Exception):
+                results.append(ticket)
+                continue
+            try:
+                results.append(self.collect(ticket))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def __find_pending(self, key):
+        for ticket in self.__pending.values():
+            if ticket['key'] == key[:len(ticket['key'])] or \
+               key == ticket['key'][:len(key)]:
+                return ticket
+        return None
+
+    def __expire(self):
+        now = monotonic()
+        for ident, ticket in list(self.__pending.items()):
+            if ticket['deadline'] <= now:
+                ticket['error'] = TimeoutError('FCP transaction timed out')
+                del self.__pending[ident]
+                self.__cond.notify_all()
+
+    def __handle_responded(self, fcp, generation, tstamp, frame, length):
+        frame = bytes(frame[:length])
+        if len(frame) < self.MATCH_LENGTH:
+            return
+        with self.__cond:
+            ticket = self.__find_pending(frame[1:])
+            if ticket is None:
+                return
+            if frame[0] == 0x0f:
+                # INTERIM response. Keep it pending till final response.
+                ticket['deadline'] = monotonic() + self.INTERIM_TIMEOUT / 1000
+            else:
+                ticket['frame'] = frame
+                del self.__pending[id(ticket)]
+            self.__cond.notify_all()
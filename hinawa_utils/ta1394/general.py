@@ -5,6 +5,7 @@ import gi
 gi.require_version('Hinawa', '4.0')
 from gi.repository import Hinawa
 
+
 __all__ = ['AvcGeneral', 'AvcConnection']
 
 
@@ -15,21 +16,59 @@ class AvcGeneral():
                      'music')
     MAXIMUM_SUBUNIT_PAGE = 0x7
 
+    _SUBUNIT_TYPE_CODES = {t: i for i, t in enumerate(SUBUNIT_TYPES)}
+
+    # PyGObject copies response frame to new object, thus the buffer given to
+    # the transaction is shared by all of calls.
+    _RESP_FRAME = bytes(256)
+
+    # Expected response code and errors for each command code.
+    RESPONSE_CODES = {
+        0x00: (0x09, {0x08: 'Not implemented', 0x0a: 'Rejected'}),
+        0x01: (0x0c, {0x08: 'Not implemented', 0x0a: 'Rejected',
+                      0x0b: 'In transition'}),
+        0x02: (0x0c, {0x08: 'Not Implemented'}),
+    }
+
+    # The engine which owns transport of FwFcp. Any command is sent via the
+    # engine once attached, so that responses are never consumed by the
+    # other waiter.
+    __engines = {}
+
+    @classmethod
+    def check_response(cls, cmd, params):
+        expected, errors = cls.RESPONSE_CODES[cmd[0]]
+        if params[0] in errors:
+            raise OSError(errors[params[0]])
+        elif params[0] != expected:
+            raise OSError('Unknown status')
+        return params
+
+    @classmethod
+    def attach_engine(cls, fcp, engine):
+        if fcp in cls.__engines:
+            raise ValueError('FwFcp is already owned by the other engine')
+        cls.__engines[fcp] = engine
+
+    @classmethod
+    def detach_engine(cls, fcp):
+        cls.__engines.pop(fcp, None)
+
+    @classmethod
+    def __transaction(cls, fcp, cmd):
+        engine = cls.__engines.get(fcp)
+        if engine is not None:
+            return engine.transaction(cmd)
+        _, params = fcp.avc_transaction(cmd, cls._RESP_FRAME, 100)
+        return cls.check_response(cmd, params)
+
     @classmethod
     def command_control(cls, fcp, cmd):
         if not isinstance(fcp, Hinawa.FwFcp):
             raise ValueError('Invalid argument for FwFcp')
         if cmd[0] != 0x00:
             raise ValueError('Invalid command code for control')
-        params = [0] * 256
-        _, params = fcp.avc_transaction(cmd, params, 100)
-        if params[0] == 0x08:
-            raise OSError('Not implemented')
-        elif params[0] == 0x0a:
-            raise OSError('Rejected')
-        elif params[0] != 0x09:
-            raise OSError('Unknown status')
-        return params
+        return cls.__transaction(fcp, cmd)
 
     @classmethod
     def command_status(cls, fcp, cmd):
@@ -37,17 +76,7 @@ class AvcGeneral():
             raise ValueError('Invalid argument for FwFcp')
         if cmd[0] != 0x01:
             raise ValueError('Invalid command code for status')
-        params = [0] * 256
-        _, params = fcp.avc_transaction(cmd, params, 100)
-        if params[0] == 0x08:
-            raise OSError('Not implemented')
-        elif params[0] == 0x0a:
-            raise OSError('Rejected')
-        elif params[0] == 0x0b:
-            raise OSError('In transition')
-        elif params[0] != 0x0c:
-            raise OSError('Unknown status')
-        return params
+        return cls.__transaction(fcp, cmd)
 
     @classmethod
     def command_inquire(cls, fcp, cmd):
@@ -55,24 +84,32 @@ class AvcGeneral():
             raise ValueError('Invalid argument for FwFcp')
         if cmd[0] != 0x02:
             raise ValueError('Invalid command code for inquire')
-        params = [0] * 256
-        _, params = fcp.avc_transaction(cmd, params, 100)
-        if params[0] == 0x08:
-            raise OSError('Not Implemented')
-        elif params[0] != 0x0c:
-            raise OSError('Unknown status')
+        cls.__transaction(fcp, cmd)
+
+    @classmethod
+    def command_status_batch(cls, fcp, cmds, match=3):
+        # The result of each command is either response frame or exception.
+        # The length of command frame to match response is given by integer or
+        # the list for each command.
+        if not isinstance(fcp, Hinawa.FwFcp):
+            raise ValueError('Invalid argument for FwFcp')
+        for cmd in cmds:
+            if cmd[0] != 0x01:
+                raise ValueError('Invalid command code for status')
+        engine = cls.__engines.get(fcp)
+        if engine is not None:
+            return engine.transact_batch(cmds, match)
+        results = []
+        for cmd in cmds:
+            try:
+                results.append(cls.__transaction(fcp, cmd))
+            except Exception as e:
+                results.append(e)
+        return results
 
     @classmethod
     def get_unit_info(cls, fcp):
-        args = bytearray()
-        args.append(0x01)
-        args.append(0xff)
-        args.append(0x30)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xff)
+        args = bytearray((0x01, 0xff, 0x30, 0xff, 0xff, 0xff, 0xff, 0xff))
         params = cls.command_status(fcp, args)
         info = {}
         info['unit-type'] = params[4] >> 3
@@ -85,15 +122,8 @@ class AvcGeneral():
     def get_subunit_info(cls, fcp, page):
         if page > cls.MAXIMUM_SUBUNIT_PAGE:
             raise ValueError('Invalid argument for page number')
-        args = bytearray()
-        args.append(0x01)
-        args.append(0xff)
-        args.append(0x31)
-        args.append(page << 4 | 0x07)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xff)
+        args = bytearray((0x01, 0xff, 0x31, page << 4 | 0x07, 0xff, 0xff, 0xff,
+                          0xff))
         params = cls.command_status(fcp, args)
         info = []
         for code in params[4:8]:
@@ -113,16 +143,11 @@ class AvcGeneral():
             raise ValueError('Invalid array for company ID')
         if len(deps) == 0:
             raise ValueError('Invalid data for vendor dependent field')
-        args = bytearray()
-        args.append(0x00)   # Control
-        args.append(0xff)   # Unit
-        args.append(0x00)   # Vendor dependent command
-        for b in company_ids:
-            args.append(b)
-        for b in deps:
-            args.append(b)
+        args = bytearray((0x00, 0xff, 0x00))    # Control, unit, vendor dep.
+        args.extend(company_ids)
+        args.extend(deps)
         params = cls.command_control(fcp, args)
-        return params[6:]
+        return memoryview(params)[6:]
 
     @classmethod
     def get_vendor_dependent(cls, fcp, company_ids, deps):
@@ -130,33 +155,24 @@ class AvcGeneral():
             raise ValueError('Invalid array for company ID')
         if len(deps) == 0:
             raise ValueError('Invalid data for vendor dependent field')
-        args = bytearray()
-        args.append(0x01)
-        args.append(0xff)
-        args.append(0x00)
-        for b in company_ids:
-            args.append(b)
-        for b in deps:
-            args.append(b)
+        args = bytearray((0x01, 0xff, 0x00))    # Status, unit, vendor dep.
+        args.extend(company_ids)
+        args.extend(deps)
         params = cls.command_status(fcp, args)
-        return params[6:]
+        return memoryview(params)[6:]
 
 
 class AvcConnection():
     PLUG_DIRECTION = ('output', 'input')
     SAMPLING_RATES = (32000, 44100, 48000, 88200, 96000, 176400, 192000)
 
+    _PLUG_DIRECTION_CODES = {d: i for i, d in enumerate(PLUG_DIRECTION)}
+    _SAMPLING_RATE_CODES = {r: i for i, r in enumerate(SAMPLING_RATES)}
+
     @classmethod
     def get_unit_plug_info(cls, fcp):
-        args = bytearray()
-        args.append(0x01)
-        args.append(0xff)
-        args.append(0x02)   # Plug info
-        args.append(0x00)   # Serial Bus Isochronous and External Plug
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xff)
+        # Serial Bus Isochronous and External Plug.
+        args = bytearray((0x01, 0xff, 0x02, 0x00, 0xff, 0xff, 0xff, 0xff))
         params = AvcGeneral.command_status(fcp, args)
         return {'isoc': {
             'input':    params[4],
@@ -167,20 +183,13 @@ class AvcConnection():
 
     @classmethod
     def get_subunit_plug_info(cls, fcp, subunit_type, subunit_id):
-        if subunit_type not in AvcGeneral.SUBUNIT_TYPES:
+        if subunit_type not in AvcGeneral._SUBUNIT_TYPE_CODES:
             raise ValueError('Invalid argument for subunit type')
         if subunit_id > 7:
             raise ValueError('Invalid argument for subunit id')
-        args = bytearray()
-        args.append(0x01)
-        args.append((AvcGeneral.SUBUNIT_TYPES.index(
-            subunit_type) << 3) | subunit_id)
-        args.append(0x02)
-        args.append(0x00)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xff)
+        subunit = AvcGeneral._SUBUNIT_TYPE_CODES[subunit_type] << 3
+        args = bytearray((0x01, subunit | subunit_id, 0x02, 0x00, 0xff, 0xff,
+                          0xff, 0xff))
         params = AvcGeneral.command_status(fcp, args)
         # Consider that destination is input and source is output.
         return {'input': params[4], 'output': params[5]}
@@ -189,36 +198,24 @@ class AvcConnection():
     def set_plug_signal_format(cls, fcp, direction, plug, rate):
         if plug > 255:
             raise ValueError('Invalid argument for plug number')
-        if direction not in AvcConnection.PLUG_DIRECTION:
+        if direction not in cls._PLUG_DIRECTION_CODES:
             raise ValueError('Invalid argument for plug direction')
-        if rate not in AvcConnection.SAMPLING_RATES:
+        if rate not in cls._SAMPLING_RATE_CODES:
             raise ValueError('Invalid argument for sampling rate')
-        args = bytearray()
-        args.append(0x00)
-        args.append(0xff)
-        args.append(0x18 + AvcConnection.PLUG_DIRECTION.index(direction))
-        args.append(plug)
-        args.append(0x90)
-        args.append(AvcConnection.SAMPLING_RATES.index(rate))
-        args.append(0xff)
-        args.append(0xff)
+        args = bytearray((0x00, 0xff,
+                          0x18 + cls._PLUG_DIRECTION_CODES[direction], plug,
+                          0x90, cls._SAMPLING_RATE_CODES[rate], 0xff, 0xff))
         AvcGeneral.command_control(fcp, args)
 
     @classmethod
     def get_plug_signal_format(cls, fcp, direction, plug):
         if plug > 255:
             raise ValueError('Invalid argument for plug number')
-        if direction not in AvcConnection.PLUG_DIRECTION:
+        if direction not in cls._PLUG_DIRECTION_CODES:
             raise ValueError('Invalid argument for plug direction')
-        args = bytearray()
-        args.append(0x01)
-        args.append(0xff)
-        args.append(0x18 + AvcConnection.PLUG_DIRECTION.index(direction))
-        args.append(plug)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xff)
+        args = bytearray((0x01, 0xff,
+                          0x18 + cls._PLUG_DIRECTION_CODES[direction], plug,
+                          0xff, 0xff, 0xff, 0xff))
         params = AvcGeneral.command_status(fcp, args)
         param = params[5] & 0x07
         if param > len(AvcConnection.SAMPLING_RATES):
@@ -229,19 +226,13 @@ class AvcConnection():
     def ask_plug_signal_format(cls, fcp, direction, plug, rate):
         if plug > 255:
             raise ValueError('Invalid argument for plug number')
-        if direction not in AvcConnection.PLUG_DIRECTION:
+        if direction not in cls._PLUG_DIRECTION_CODES:
             raise ValueError('Invalid argument for plug direction')
-        if rate not in AvcConnection.SAMPLING_RATES:
+        if rate not in cls._SAMPLING_RATE_CODES:
             raise ValueError('Invalid argument for sampling rate')
-        args = bytearray()
-        args.append(0x02)
-        args.append(0xff)
-        args.append(0x18 + AvcConnection.PLUG_DIRECTION.index(direction))
-        args.append(plug)
-        args.append(0x90)
-        args.append(AvcConnection.SAMPLING_RATES.index(rate))
-        args.append(0xff)
-        args.append(0xff)
+        args = bytearray((0x02, 0xff,
+                          0x18 + cls._PLUG_DIRECTION_CODES[direction], plug,
+                          0x90, cls._SAMPLING_RATE_CODES[rate], 0xff, 0xff))
         try:
             AvcGeneral.command_inquire(fcp, args)
         except OSError:
@@ -37,6 +37,19 @@ class AvcStreamFormatInfo():
              'do-not-care',     # 0xff
              'reserved')        # the others
 
+    _PLUG_DIRECTION_CODES = {d: i for i, d in enumerate(PLUG_DIRECTION)}
+    # The first index is used for duplicated entries.
+    _SAMPLING_RATE_CODES = {r: i for i, r in reversed(
+                            list(enumerate(SAMPLING_RATES)))}
+    _RATE_CONTROL_CODES = {c: i for i, c in enumerate(RATE_CONTROLS)}
+    _TYPE_CODES = {t: i for i, t in enumerate(TYPES)}
+    _TYPE_CODES.update({
+        'ancillary-data':   0x10,
+        'sync-stream':      0x40,
+        'do-not-care':      0xff,
+        'reserved':         0xfe,   # Use this value.
+    })
+
     @classmethod
     def _parse_format(cls, params):
         if params[0] != 0x90 or params[1] != 0x40:
@@ -63,32 +76,20 @@ class AvcStreamFormatInfo():
 
     @classmethod
     def _build_format(cls, fmt):
-        if fmt['sampling-rate'] not in cls.SAMPLING_RATES:
+        if fmt['sampling-rate'] not in cls._SAMPLING_RATE_CODES:
             raise ValueError('Invalid argument for sampling rate')
-        if fmt['rate-control'] not in cls.RATE_CONTROLS:
+        if fmt['rate-control'] not in cls._RATE_CONTROL_CODES:
             raise ValueError('Invalid argument for rate control mode')
-        args = bytearray()
-        args.append(0x90)
-        args.append(0x40)
-        args.append(cls.SAMPLING_RATES.index(fmt['sampling-rate']))
-        args.append(cls.RATE_CONTROLS.index(fmt['rate-control']))
-        args.append(0x00)     # Set it later.
+        args = bytearray((0x90, 0x40,
+                          cls._SAMPLING_RATE_CODES[fmt['sampling-rate']],
+                          cls._RATE_CONTROL_CODES[fmt['rate-control']],
+                          0x00))    # Set it later.
         prev = ''
         num = -1
         for i, formation in enumerate(fmt['formation']):
-            if formation not in cls.TYPES:
+            if formation not in cls._TYPE_CODES:
                 raise ValueError('Invalid argument for stream formation type')
-            if formation == 'ancillary-data':
-                type = 0x10
-            elif formation == 'sync-stream':
-                type = 0x40
-            elif formation == 'do-not-care':
-                type = 0xff
-            elif formation == 'reserved':
-                # Use this value.
-                type = 0xfe
-            else:
-                type = cls.TYPES.index(formation)
+            type = cls._TYPE_CODES[formation]
             if type != prev or i == len(fmt['formation']) - 1:
                 if num > 0:
                     args.append(num + 1)
@@ -102,68 +103,44 @@ class AvcStreamFormatInfo():
 
     @classmethod
     def set_format(cls, fcp, direction, plug, fmt):
-        args = bytearray()
-        args.append(0x00)   # Control
-        args.append(0xff)   # Addressing to unit
-        args.append(0xbf)   # Extended stream format information command
-        args.append(0xc0)   # SINGLE subfunction
-        args.append(cls.PLUG_DIRECTION.index(direction))
-        args.append(0x00)
-        args.append(0x00)
-        args.append(plug)
-        args.append(0xff)
-        args.append(0xff)
+        if direction not in cls._PLUG_DIRECTION_CODES:
+            raise ValueError('Invalid argument for plug direction')
+        if plug > 255:
+            raise ValueError('Invalid argument for plug number')
+        args = bytearray((0x00, 0xff, 0xbf, 0xc0,
+                          cls._PLUG_DIRECTION_CODES[direction], 0x00, 0x00,
+                          plug, 0xff, 0xff))
         args.extend(cls._build_format(fmt))
         AvcGeneral.command_control(fcp, args)
 
     @classmethod
     def get_format(cls, fcp, direction, plug):
-        if direction not in cls.PLUG_DIRECTION:
+        if direction not in cls._PLUG_DIRECTION_CODES:
             raise ValueError('Invalid argument for plug direction')
         if plug > 255:
             raise ValueError('Invalid argument for plug number')
-        args = bytearray()
-        args.append(0x01)
-        args.append(0xff)
-        args.append(0xbf)
-        args.append(0xc0)
-        args.append(cls.PLUG_DIRECTION.index(direction))
-        args.append(0x00)
-        args.append(0x00)
-        args.append(plug)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0xff)
+        args = bytearray((0x01, 0xff, 0xbf, 0xc0,
+                          cls._PLUG_DIRECTION_CODES[direction], 0x00, 0x00,
+                          plug, 0xff, 0xff, 0xff, 0xff))
         params = AvcGeneral.command_status(fcp, args)
 
-        return cls._parse_format(params[10:len(params)])
+        return cls._parse_format(memoryview(params)[10:])
 
     @classmethod
     def get_formats(cls, fcp, direction, plug):
-        if direction not in cls.PLUG_DIRECTION:
+        if direction not in cls._PLUG_DIRECTION_CODES:
             raise ValueError('Invalid argument for plug direction')
         if plug > 255:
             raise ValueError('Invalid argument for plug number')
         fmts = []
-        args = bytearray()
-        args.append(0x01)
-        args.append(0xff)
-        args.append(0xbf)
-        args.append(0xc1)
-        args.append(cls.PLUG_DIRECTION.index(direction))
-        args.append(0x00)
-        args.append(0x00)
-        args.append(plug)
-        args.append(0xff)
-        args.append(0xff)
-        args.append(0x00)
-        args.append(0xff)
+        args = bytearray((0x01, 0xff, 0xbf, 0xc1,
+                          cls._PLUG_DIRECTION_CODES[direction], 0x00, 0x00,
+                          plug, 0xff, 0xff, 0x00, 0xff))
         for i in range(255):
             args[10] = i
             try:
                 params = AvcGeneral.command_status(fcp, args)
-                fmt = cls._parse_format(params[11:])
+                fmt = cls._parse_format(memoryview(params)[11:])
                 fmts.append(fmt)
             except Exception as e:
                 break